@@ -1,92 +1,125 @@
 import os
+import hashlib
 import sqlite3
-from flask import Flask, g, jsonify, request
+from flask import Flask, jsonify, request, Response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import time
 from functools import wraps
-import re
+import zlib
+import time
+import shutil
+import tempfile
 from datetime import datetime
 
 # Import our database module
 from database import (
-    init_database, create_recitation, get_recitation, get_all_recitations,
-    update_recitation, delete_recitation, get_recitation_stats,
-    backup_database, export_recitations_to_csv
+    init_database, create_recitation, create_recitations_batch, validate_recitation,
+    get_recitation, get_all_recitations, count_recitations, encode_cursor, parse_order_by,
+    update_recitation, delete_recitation, get_recitation_stats, get_mistake_frequencies,
+    get_data_version, get_recitation_changes,
+    stream_recitations_csv, stream_recitations_ndjson,
+    current_database, set_current_database, reset_current_database, use_database, open_user_database,
+    init_user_tokens, resolve_user_token
 )
+import database
+from qul_db import QulDatabases, DEFAULT_QUL_DATABASES, DEFAULT_QUL_BUNDLE
+from qul_bundle import load_bundle
+from mushaf_index import MushafIndex
+from quran_meta import MushafMetadata, SURAH_NAMES, JUZ_STARTS
+from payload_store import PayloadStore, make_payload, encode_json, available_formats, FORMAT_MIMETYPES
+from lru_cache import LRUCache
+import metrics
+from mistake_analytics import build_mistake_heatmap
+from search_index import load_search_index, remove_diacritics
+from revision_scheduler import init_revision_schedule, get_due_pages
+from backups import BackupManager
+from import_recitations import import_rows, read_rows, metadata_resolver, parse_recitation_date
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with encoding time reported as the request's 'encode' phase."""
+
+    def dumps(self, obj, **kwargs):
+        with metrics.phase('encode'):
+            return super().dumps(obj, **kwargs)
 
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app)
 
 # Initialize database on startup
 init_database()
+init_revision_schedule()
+init_user_tokens()
+
+# Named QUL databases; override with FLASK_QUL_DATABASES='{"layout": "...", "script": "..."}'
+app.config['QUL_DATABASES'] = dict(DEFAULT_QUL_DATABASES)
+app.config['QUL_BUNDLE'] = DEFAULT_QUL_BUNDLE
+app.config['SLOW_QUERY_MS'] = None  # e.g. FLASK_SLOW_QUERY_MS=50 prints statements slower than 50ms
+app.config['USER_SHARD_DIR'] = database.USER_SHARD_DIR  # one SQLite file per user under here
+app.config['REQUIRE_USER_TOKEN'] = False  # FLASK_REQUIRE_USER_TOKEN=true: no shared database over HTTP
+app.config.from_prefixed_env()
+if app.config['SLOW_QUERY_MS'] is not None:
+    metrics.SLOW_QUERY_SECONDS = float(app.config['SLOW_QUERY_MS']) / 1000
+database.USER_SHARD_DIR = app.config['USER_SHARD_DIR']
+QUL = QulDatabases({**app.config['QUL_DATABASES'], 'bundle': app.config['QUL_BUNDLE']})
+
+# --- Database Connection Utilities ---
+def get_db(name):
+    """Shared read-only handle to a configured QUL database, opened once per process."""
+    return QUL.get(name)
+
+# Build the read-only Mushaf index once; page lookups never touch SQLite after this.
+# The compiled bundle (python qul_bundle.py) is preferred: its words carry
+# text_normalized and its lines and page metadata need no fixing up.
+QUL_BUNDLE_INFO = None
+if os.path.exists(app.config['QUL_BUNDLE']):
+    try:
+        MUSHAF, METADATA, QUL_BUNDLE_INFO = load_bundle(get_db('bundle'), {
+            name: app.config['QUL_DATABASES'][name] for name in ('layout', 'script')
+        })
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Ignoring QUL bundle: {e}")
+if QUL_BUNDLE_INFO is None:
+    MUSHAF = MushafIndex(get_db('layout'), get_db('script'))
+    METADATA = MushafMetadata(MUSHAF)
+QUL_CONTENT_HASH = QUL_BUNDLE_INFO['content_hash'] if QUL_BUNDLE_INFO else None
 
-# Paths to QUL databases (update if needed)
-QUL_LAYOUT_DB = os.path.join(os.path.dirname(__file__), '../qul_downloads/qudratullah-indopak-15-lines.db')
-QUL_SCRIPT_DB = os.path.join(os.path.dirname(__file__), '../qul_downloads/indopak.db')
+# Word search index, persisted next to the script database and memory-mapped;
+# rebuilt automatically when the QUL files change
+SEARCH_INDEX_PATH = os.path.splitext(app.config['QUL_DATABASES']['script'])[0] + '.search.idx'
+SEARCH = load_search_index(
+    MUSHAF, SEARCH_INDEX_PATH,
+    [app.config['QUL_DATABASES']['script'], app.config['QUL_DATABASES']['layout']]
+)
 
-# --- Simple In-Memory Cache with TTL ---
-CACHE = {}
+# --- Bounded In-Memory Cache with TTL ---
 CACHE_TTL = 60  # seconds
+CACHE_MAX_ENTRIES = 1024
+CACHE = LRUCache(max_entries=CACHE_MAX_ENTRIES, default_ttl=CACHE_TTL)
+metrics.register_cache('quran', CACHE)
 
-def cache_with_ttl(key_func):
+def cache_with_ttl(key_func, cache=CACHE, ttl=CACHE_TTL):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             key = key_func(*args, **kwargs)
-            now = time.time()
-            if key in CACHE:
-                value, timestamp = CACHE[key]
-                if now - timestamp < CACHE_TTL:
-                    return value
-            result = func(*args, **kwargs)
-            CACHE[key] = (result, now)
-            return result
+            return cache.get_or_set(key, lambda: func(*args, **kwargs), ttl)
+        wrapper.cache = cache
         return wrapper
     return decorator
 
-# --- Database Connection Utilities ---
-def get_db(db_path):
-    db = getattr(g, '_db_' + os.path.basename(db_path), None)
-    if db is None:
-        db = sqlite3.connect(db_path)
-        db.row_factory = sqlite3.Row
-        setattr(g, '_db_' + os.path.basename(db_path), db)
-    return db
-
-@app.teardown_appcontext
-def close_db(error):
-    for attr in dir(g):
-        if attr.startswith('_db_'):
-            db = getattr(g, attr)
-            if db is not None:
-                db.close()
-
 # --- Models (as helper functions) ---
 def get_pages(page_number=None):
-    db = get_db(QUL_LAYOUT_DB)
-    if page_number is not None:
-        cur = db.execute('SELECT * FROM pages WHERE page_number = ?', (page_number,))
-    else:
-        cur = db.execute('SELECT * FROM pages')
-    return [dict(row) for row in cur.fetchall()]
+    return MUSHAF.get_lines(page_number)
 
 def get_words(word_ids=None):
-    db = get_db(QUL_SCRIPT_DB)
-    if word_ids:
-        placeholders = ','.join('?' for _ in word_ids)
-        cur = db.execute(f'SELECT * FROM words WHERE id IN ({placeholders})', word_ids)
-    else:
-        cur = db.execute('SELECT * FROM words')
-    return [dict(row) for row in cur.fetchall()]
+    return MUSHAF.get_words(word_ids or None)
 
 # --- Cached Data Fetchers ---
 @cache_with_ttl(lambda page_number: f"page:{page_number}")
 def cached_get_page(page_number):
     lines = get_pages(page_number)
-    word_ids = []
-    for line in lines:
-        if line['line_type'] == 'ayah':
-            word_ids.extend(range(line['first_word_id'], line['last_word_id'] + 1))
+    word_ids = MUSHAF.page_word_ids(page_number)
     words = get_words(word_ids) if word_ids else []
     word_map = {w['id']: w for w in words}
     # When building the pageData response, ensure first_word_id and last_word_id are None if not present
@@ -103,35 +136,21 @@ def cached_get_page(page_number):
         })
     return {'pageData': page_data, 'wordData': word_map}
 
+# Juz and surah entries hold page numbers only; the page data itself is shared
+# through the page:<n> entries rather than copied into every juz/surah result.
 @cache_with_ttl(lambda juz_number: f"juz:{juz_number}")
-def cached_get_juz(juz_number):
-    db = get_db(QUL_LAYOUT_DB)
-    cur = db.execute('SELECT DISTINCT page_number FROM pages WHERE juz = ?', (juz_number,))
-    page_numbers = [row['page_number'] for row in cur.fetchall()]
-    result = {}
-    for page_number in page_numbers:
-        result[page_number] = cached_get_page(page_number)
-    return result
+def cached_get_juz_pages(juz_number):
+    return METADATA.juz_pages(juz_number)
 
 @cache_with_ttl(lambda surah_number: f"surah:{surah_number}")
-def cached_get_surah(surah_number):
-    db = get_db(QUL_LAYOUT_DB)
-    cur = db.execute('SELECT DISTINCT page_number FROM pages WHERE surah_number = ?', (surah_number,))
-    page_numbers = [row['page_number'] for row in cur.fetchall()]
-    result = {}
-    for page_number in page_numbers:
-        result[page_number] = cached_get_page(page_number)
-    return result
+def cached_get_surah_pages(surah_number):
+    return METADATA.surah_pages(surah_number)
 
 # --- Data Transformation Utilities ---
-def remove_diacritics(text):
-    # Remove Arabic diacritics (tashkeel)
-    arabic_diacritics = re.compile(r'[\u0610-\u061A\u064B-\u065F\u06D6-\u06ED]')
-    return arabic_diacritics.sub('', text)
-
 def enrich_word_metadata(word):
-    # Add normalized text and other metadata
-    word['text_normalized'] = remove_diacritics(word['text'])
+    # Add normalized text (precomputed when loaded from the bundle) and other metadata
+    normalized = MUSHAF.normalized_text(word['id'])
+    word['text_normalized'] = normalized if normalized is not None else remove_diacritics(word['text'])
     # Add more enrichment as needed
     return word
 
@@ -139,6 +158,91 @@ def transform_word_map(word_map):
     # Apply enrichment to all words
     return {k: enrich_word_metadata(dict(v)) for k, v in word_map.items()}
 
+# --- Request Metrics ---
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    metrics.begin_request()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUESTS.inc(endpoint, request.method, response.status_code)
+    metrics.HTTP_DURATION.observe(time.perf_counter() - g.metrics_started, endpoint, request.method)
+    for name, seconds in metrics.end_request().items():
+        metrics.HTTP_PHASE.observe(seconds, endpoint, name)
+    if not response.is_streamed:
+        metrics.HTTP_RESPONSE_SIZE.observe(response.calculate_content_length() or 0, endpoint)
+    return response
+
+# --- User Routing ---
+# A request with ``Authorization: Bearer <token>`` reads and writes the shard
+# of the user the token was issued to (python user_tokens.py add <user>).
+# The token is the trust boundary: the client never names a user, so it can
+# only reach data it holds a token for. Requests without a token use the
+# shared database, which anyone who can reach the server can read and write;
+# set REQUIRE_USER_TOKEN to refuse them instead. The QUL data and page
+# payloads are the same for everyone and stay shared.
+AUTH_HEADER = 'Authorization'
+TRACKER_PATHS = ('/api/recitations', '/api/revision', '/api/analytics')
+
+def init_user_database():
+    """Schema and revision schedule for a user's shard, run once per process per shard."""
+    init_database()
+    init_revision_schedule()
+
+def bearer_token():
+    """The request's bearer token; None when absent or blank."""
+    scheme, _, token = request.headers.get(AUTH_HEADER, '').strip().partition(' ')
+    token = token.strip()
+    return token if scheme.lower() == 'bearer' and token else None
+
+@app.before_request
+def route_user_database():
+    g.user_id = None
+    g.database_token = None
+    token = bearer_token()
+    if token is None:
+        if app.config['REQUIRE_USER_TOKEN'] and request.path.startswith(TRACKER_PATHS):
+            return jsonify({'error': 'A user token is required'}), 401
+        return None
+    g.user_id = resolve_user_token(token)
+    if g.user_id is None:
+        return jsonify({'error': 'Invalid or revoked user token'}), 401
+    g.database_token = set_current_database(open_user_database(g.user_id, init_user_database))
+    return None
+
+@app.teardown_request
+def reset_user_database(exc):
+    token = g.pop('database_token', None)
+    if token is not None:
+        reset_current_database(token)
+
+def stream_in_database(chunks):
+    """Iterate a streamed body against the request's database.
+
+    The body is produced after the request is torn down, so each step
+    reselects the database the request was routed to.
+    """
+    path = current_database()  # read now, while the request is still routed
+    
+    def generate():
+        iterator = iter(chunks)
+        done = object()
+        while True:
+            with use_database(path):
+                chunk = next(iterator, done)
+            if chunk is done:
+                return
+            yield chunk
+    
+    return generate()
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Counters and histograms for this process in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # --- Test Route ---
 @app.route('/api/quran/test')
 def test_connection():
@@ -152,64 +256,272 @@ def test_connection():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# --- Precomputed Response Payloads ---
+def build_page_data(page_number):
+    data = cached_get_page(page_number)
+    if not data['pageData']:
+        return None
+    with metrics.phase('normalize'):
+        word_data = transform_word_map(data['wordData'])
+    return {'pageData': data['pageData'], 'wordData': word_data}
+
+PAYLOADS = PayloadStore(build_page_data)
+PAYLOADS.warm(range(1, MUSHAF.page_count + 1))
+METADATA_PAYLOAD = make_payload(encode_json({**METADATA.to_dict(), 'content_hash': QUL_CONTENT_HASH}))
+
+# Set by warm_up(); reported by /api/ready
+WARM_STATE = {'ready': False, 'seconds': None, 'payloads': 0}
+
+def warm_up():
+    """Build every precomputed response ahead of traffic.
+    
+    Pages are built at import; this adds the other formats and every juz and
+    surah payload, so no request pays for a first build. serve.py runs it in
+    the master process before forking workers.
+    """
+    started = time.perf_counter()
+    built = 0
+    for fmt in available_formats():
+        PAYLOADS.warm(range(1, MUSHAF.page_count + 1), fmt)
+        for juz_number in range(1, len(JUZ_STARTS) + 1):
+            built += PAYLOADS.get_group(f'juz:{juz_number}', cached_get_juz_pages(juz_number), fmt) is not None
+        for surah_number in range(1, len(SURAH_NAMES) + 1):
+            built += PAYLOADS.get_group(f'surah:{surah_number}', cached_get_surah_pages(surah_number), fmt) is not None
+        built += MUSHAF.page_count
+    WARM_STATE.update(ready=True, seconds=round(time.perf_counter() - started, 2), payloads=built)
+
+# Page, juz and surah responses come in several wire formats (payload_store.FORMAT_MIMETYPES),
+# chosen with ?format= or the Accept header
+COLUMNAR_MIMETYPE = FORMAT_MIMETYPES['columnar']
+ACCEPT_FORMATS = {
+    'application/json': 'json',
+    COLUMNAR_MIMETYPE: 'columnar',
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack'
+}
+
+def requested_format():
+    """The wire format asked for, or None if it is unknown or unavailable here."""
+    fmt = request.args.get('format')
+    if fmt is None:
+        offered = [mimetype for mimetype, name in ACCEPT_FORMATS.items() if name in available_formats()]
+        fmt = ACCEPT_FORMATS[request.accept_mimetypes.best_match(offered, default='application/json')]
+    return fmt if fmt in available_formats() else None
+
+def unsupported_format_response():
+    return jsonify({
+        'error': f"Unsupported format; use one of: {', '.join(available_formats())}"
+    }), 406
+
+def payload_response(payload, fmt='json'):
+    """Serve precomputed bytes with a strong ETag, honouring If-None-Match.
+    
+    Each content-coding is a different representation, so the encoding is
+    part of the ETag (``"<hash>-gzip"``).
+    """
+    encoding = None
+    if payload.br is not None and request.accept_encodings['br']:
+        encoding = 'br'
+    elif request.accept_encodings['gzip']:
+        encoding = 'gzip'
+    etag = f'{payload.etag}-{encoding}' if encoding else payload.etag
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'Vary': 'Accept, Accept-Encoding'
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(payload.variant(encoding), mimetype=FORMAT_MIMETYPES[fmt], headers=headers)
+
+@app.route('/api/ready')
+def readiness():
+    """Readiness probe: 200 once warm_up() has finished, 503 before."""
+    status = {**WARM_STATE, 'pid': os.getpid(), 'content_hash': QUL_CONTENT_HASH}
+    return jsonify(status), 200 if WARM_STATE['ready'] else 503
+
 # --- API Endpoints for QUL Data ---
 @app.route('/api/quran/page/<int:page_number>')
 def get_page_data(page_number):
     try:
-        data = cached_get_page(page_number)
-        if not data['pageData']:
+        fmt = requested_format()
+        if fmt is None:
+            return unsupported_format_response()
+        payload = PAYLOADS.get_page(page_number, fmt)
+        if payload is None:
             return jsonify({'error': 'Page not found'}), 404
-        # Transform word map
-        data['wordData'] = transform_word_map(data['wordData'])
-        return jsonify(data)
+        return payload_response(payload, fmt)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/quran/meta')
+def get_quran_metadata():
+    """Page -> juz/surah/ayah index plus juz and surah page ranges."""
+    return payload_response(METADATA_PAYLOAD)
+
+@app.route('/api/quran/meta/page/<int:page_number>')
+def get_page_metadata(page_number):
+    info = METADATA.page_info(page_number)
+    if info is None:
+        return jsonify({'error': 'Page not found'}), 404
+    return jsonify(info)
+
+MAX_SEARCH_RESULTS = 500
+
+@app.route('/api/quran/search')
+def search_quran():
+    """Diacritic-insensitive phrase search: ?q=<words>&limit=<n>."""
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', type=int, default=50)
+        if limit < 1:
+            return jsonify({'error': 'limit must be >= 1'}), 400
+        limit = min(limit, MAX_SEARCH_RESULTS)
+        with metrics.phase('search'):
+            results = SEARCH.search(query, limit=limit)
+        if not results['terms']:
+            return jsonify({'error': 'Query must contain Arabic letters'}), 400
+        
+        for result in results['results']:
+            result['surah_name'] = SURAH_NAMES[result['surah'] - 1]
+        results['query'] = query
+        return jsonify(results)
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/quran/juz/<int:juz_number>')
 def get_juz_data(juz_number):
     try:
-        data = cached_get_juz(juz_number)
-        if not data:
+        fmt = requested_format()
+        if fmt is None:
+            return unsupported_format_response()
+        page_numbers = cached_get_juz_pages(juz_number)
+        payload = PAYLOADS.get_group(f'juz:{juz_number}', page_numbers, fmt) if page_numbers else None
+        if payload is None:
             return jsonify({'error': 'Juz not found'}), 404
-        # Transform word maps for each page
-        for page in data:
-            data[page]['wordData'] = transform_word_map(data[page]['wordData'])
-        return jsonify(data)
+        return payload_response(payload, fmt)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/quran/surah/<int:surah_number>')
 def get_surah_data(surah_number):
     try:
-        data = cached_get_surah(surah_number)
-        if not data:
+        fmt = requested_format()
+        if fmt is None:
+            return unsupported_format_response()
+        payload = PAYLOADS.get_group(f'surah:{surah_number}', cached_get_surah_pages(surah_number), fmt)
+        if payload is None:
             return jsonify({'error': 'Surah not found'}), 404
-        # Transform word maps for each page
-        for page in data:
-            data[page]['wordData'] = transform_word_map(data[page]['wordData'])
-        return jsonify(data)
+        return payload_response(payload, fmt)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# --- Mistake Analytics ---
+# Heatmaps are cached per data version: every write moves to a new version, so
+# a heatmap computed before the write is never served after it, in any worker.
+def cached_mistake_heatmap(scope, number):
+    """Heatmap for one page, juz or surah, or None if it does not exist."""
+    if scope == 'page':
+        page_numbers = range(number, number + 1) if METADATA.page_info(number) else range(0)
+    elif scope == 'juz':
+        page_numbers = cached_get_juz_pages(number)
+    else:
+        page_numbers = cached_get_surah_pages(number)
+    if not page_numbers:
+        return None
+    
+    def build():
+        heatmap = build_mistake_heatmap(
+            MUSHAF,
+            get_mistake_frequencies(page_numbers[0], page_numbers[-1]),
+            surah=number if scope == 'surah' else None,
+            juz=number if scope == 'juz' else None
+        )
+        heatmap.update({scope: number, 'first_page': page_numbers[0], 'last_page': page_numbers[-1]})
+        return heatmap
+    
+    return CACHE.get_or_set(f'mistakes:{current_database()}:{get_data_version()}:{scope}:{number}', build)
+
+@app.route('/api/analytics/mistakes', methods=['GET'])
+def get_mistake_heatmap_endpoint():
+    """Per-word and per-ayah mistake frequency for ?page=, ?juz= or ?surah=."""
+    try:
+        scopes = [(scope, request.args.get(scope, type=int)) for scope in ('page', 'juz', 'surah')]
+        scopes = [(scope, number) for scope, number in scopes if number is not None]
+        if len(scopes) != 1:
+            return jsonify({'error': 'Specify exactly one of page, juz or surah'}), 400
+        
+        scope, number = scopes[0]
+        heatmap = cached_mistake_heatmap(scope, number)
+        if heatmap is None:
+            return jsonify({'error': f'{scope.capitalize()} not found'}), 404
+        return jsonify(heatmap)
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to get mistake analytics: {str(e)}'}), 500
+
+# --- Revision Schedule ---
+MAX_DUE_LIMIT = 610
+
+@app.route('/api/revision/due', methods=['GET'])
+def get_due_pages_endpoint():
+    """Pages due for revision, most overdue first, from the indexed schedule."""
+    try:
+        limit = min(request.args.get('limit', type=int, default=20), MAX_DUE_LIMIT)
+        as_of = request.args.get('as_of')
+        if as_of:
+            try:
+                as_of = datetime.fromisoformat(as_of.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                return jsonify({'error': 'Invalid as_of format. Use ISO format.'}), 400
+        
+        due = get_due_pages(limit=limit, as_of=as_of)
+        for page in due['pages']:
+            page['surah_name'] = METADATA.page_surah_name(page['page_number'])
+            page['juz'] = METADATA.page_juz(page['page_number'])
+        return jsonify(due)
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to get due pages: {str(e)}'}), 500
+
 # --- Recitation API Endpoints ---
 
+def validate_submitted_recitation(item):
+    """Check a recitation sent by a client and return its page's metadata; raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError('Recitation must be an object')
+    for field in ('page_number', 'rating'):
+        if field not in item:
+            raise ValueError(f'Missing required field: {field}')
+    page_number = item['page_number']
+    page_info = METADATA.page_info(page_number) if type(page_number) is int else None
+    if page_info is None:
+        raise ValueError(f'Invalid page_number: {page_number!r}')
+    if item.get('notes') is not None and not isinstance(item['notes'], str):
+        raise ValueError('notes must be a string')
+    validate_recitation(item['rating'], item.get('manual_mistakes'))
+    return page_info
+
 @app.route('/api/recitations', methods=['POST'])
 def create_recitation_endpoint():
     """Create a new recitation session."""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({'error': 'Request body must be JSON'}), 400
         
-        # Validate required fields
-        required_fields = ['page_number', 'surah_name', 'juz', 'rating']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        # Surah and juz are derived from the page rather than trusted from the client
+        page_info = validate_submitted_recitation(data)
         
         # Create the recitation
         recitation_id = create_recitation(
             page_number=data['page_number'],
-            surah_name=data['surah_name'],
-            juz=data['juz'],
+            surah_name=page_info['surah_names'][0],
+            juz=page_info['juz'],
             rating=data['rating'],
             manual_mistakes=data.get('manual_mistakes'),
             notes=data.get('notes')
@@ -225,10 +537,118 @@ def create_recitation_endpoint():
     except Exception as e:
         return jsonify({'error': f'Failed to create recitation: {str(e)}'}), 500
 
+MAX_BATCH_SIZE = 5000
+
+@app.route('/api/recitations/batch', methods=['POST'])
+def create_recitations_batch_endpoint():
+    """Create many recitation sessions in one request and one transaction."""
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('recitations') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a JSON array of recitations'}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch too large: at most {MAX_BATCH_SIZE} recitations'}), 400
+        
+        # Validate everything up front; invalid items are reported, valid ones inserted
+        results = [None] * len(items)
+        valid_indexes = []
+        valid_items = []
+        for index, item in enumerate(items):
+            try:
+                page_info = validate_submitted_recitation(item)
+                # Sessions queued offline keep the time they were recorded at
+                recitation_date = parse_recitation_date(item.get('recitation_date'))
+            except (ValueError, TypeError) as e:
+                results[index] = {'index': index, 'error': str(e)}
+                continue
+            valid_indexes.append(index)
+            valid_items.append({
+                'page_number': item['page_number'],
+                'surah_name': page_info['surah_names'][0],
+                'juz': page_info['juz'],
+                'rating': item['rating'],
+                'manual_mistakes': item.get('manual_mistakes'),
+                'notes': item.get('notes'),
+                'recitation_date': recitation_date
+            })
+        
+        ids = create_recitations_batch(valid_items)
+        for index, recitation_id in zip(valid_indexes, ids):
+            results[index] = {'index': index, 'id': recitation_id}
+        
+        failed = len(items) - len(ids)
+        if failed == 0:
+            status = 201
+        elif ids:
+            status = 207
+        else:
+            status = 400
+        return jsonify({
+            'results': results,
+            'created': len(ids),
+            'failed': failed
+        }), status
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to create recitations: {str(e)}'}), 500
+
+IMPORT_SPOOL_MEMORY = 8 * 1024 * 1024  # a raw Excel upload larger than this spools to disk
+
+@app.route('/api/recitations/import', methods=['POST'])
+def import_recitations_endpoint():
+    """Bulk import recitation history from an uploaded CSV or Excel file."""
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            stream, filename = upload.stream, upload.filename or ''
+        else:
+            # Raw body upload; ?format=xlsx for Excel, CSV otherwise
+            stream, filename = request.stream, f"upload.{request.args.get('format', 'csv')}"
+            if filename.lower().endswith(('.xlsx', '.xlsm')):
+                # openpyxl seeks around the zip, which the request stream cannot do
+                stream = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MEMORY)
+                shutil.copyfileobj(request.stream, stream)
+                stream.seek(0)
+        
+        # Batch by batch, never bulk mode: each batch holds the write lock only
+        # briefly, so sessions posted during a large upload are not locked out.
+        # Batches committed before an unreadable stretch of the file stay, and
+        # the report (with its error) says how far the import got.
+        report = import_rows(read_rows(stream, filename), metadata_resolver(METADATA))
+        status = 200 if report['imported'] or not (report['failed'] or report['error']) else 400
+        return jsonify(report), status
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to import recitations: {str(e)}'}), 500
+
+def recitations_etag(version):
+    """ETag for a recitation read: the data version plus the user and the exact query."""
+    key = f"{current_database()}\n{request.full_path}"
+    return f"v{version}-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+
+def versioned_response(data, etag):
+    """JSON response clients must revalidate, answering 304 while the data version is unchanged."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = AUTH_HEADER
+    return response
+
 @app.route('/api/recitations', methods=['GET'])
 def get_recitations_endpoint():
     """Get all recitations with optional filtering and pagination."""
     try:
+        # Read the version before the rows: a write in between can only make the ETag older
+        etag = recitations_etag(get_data_version())
+        if request.if_none_match.contains(etag):
+            return versioned_response(None, etag)
+        
         # Get query parameters
         page_number = request.args.get('page_number', type=int)
         surah_name = request.args.get('surah_name')
@@ -236,13 +656,13 @@ def get_recitations_endpoint():
         rating = request.args.get('rating')
         limit = request.args.get('limit', type=int, default=50)
         offset = request.args.get('offset', type=int, default=0)
+        cursor = request.args.get('cursor')
         order_by = request.args.get('order_by', default='recitation_date DESC')
         
         # Validate order_by to prevent SQL injection
-        allowed_order_fields = ['recitation_date', 'page_number', 'surah_name', 'juz', 'rating', 'created_at']
-        order_field, order_direction = order_by.split() if ' ' in order_by else (order_by, 'ASC')
-        
-        if order_field not in allowed_order_fields:
+        try:
+            parse_order_by(order_by)
+        except ValueError:
             order_by = 'recitation_date DESC'
         
         # Get recitations
@@ -253,21 +673,52 @@ def get_recitations_endpoint():
             rating=rating,
             limit=limit,
             offset=offset,
-            order_by=order_by
+            order_by=order_by,
+            cursor=cursor
+        )
+        total = count_recitations(
+            page_number=page_number,
+            surah_name=surah_name,
+            juz=juz,
+            rating=rating
         )
         
-        return jsonify({
+        # A full page means there may be more; hand back a cursor to continue from
+        next_cursor = encode_cursor(recitations[-1], order_by) if limit and len(recitations) == limit else None
+        
+        return versioned_response({
             'recitations': recitations,
-            'total': len(recitations),
+            'total': total,
             'limit': limit,
-            'offset': offset
-        })
+            'offset': offset,
+            'next_cursor': next_cursor
+        }, etag)
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to get recitations: {str(e)}'}), 500
 
+MAX_CHANGES_LIMIT = 5000
+
+@app.route('/api/recitations/changes', methods=['GET'])
+def get_recitation_changes_endpoint():
+    """Delta sync: rows changed and ids deleted since ?since=<version>."""
+    try:
+        since = request.args.get('since', type=int, default=0)
+        limit = request.args.get('limit', type=int, default=1000)
+        if since < 0 or limit < 1:
+            return jsonify({'error': 'since must be >= 0 and limit >= 1'}), 400
+        
+        etag = recitations_etag(get_data_version())
+        if request.if_none_match.contains(etag):
+            return versioned_response(None, etag)
+        
+        return versioned_response(get_recitation_changes(since, min(limit, MAX_CHANGES_LIMIT)), etag)
+        
+    except Exception as e:
+        return jsonify({'error': f'Failed to get recitation changes: {str(e)}'}), 500
+
 @app.route('/api/recitations/<int:recitation_id>', methods=['GET'])
 def get_recitation_endpoint(recitation_id):
     """Get a specific recitation by ID."""
@@ -353,62 +804,102 @@ def get_recitation_stats_endpoint():
     except Exception as e:
         return jsonify({'error': f'Failed to get stats: {str(e)}'}), 500
 
+def gzip_stream(chunks):
+    """Compress a text (or bytes) stream on the fly, flushing after every chunk."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/quran/pages')
+def get_page_range_data():
+    """Stream pages ?from=..&to= as NDJSON, one page per line, in page order."""
+    first = request.args.get('from', type=int)
+    last = request.args.get('to', type=int, default=first)
+    if first is None or last is None or first > last:
+        return jsonify({'error': 'Specify a page range with from <= to'}), 400
+    if first < 1 or first > MUSHAF.page_count:
+        return jsonify({'error': f'Pages must be between 1 and {MUSHAF.page_count}'}), 404
+    
+    # A range running past the end stops at the last page
+    page_numbers = range(first, min(last, MUSHAF.page_count) + 1)
+    gzipped = bool(request.accept_encodings['gzip'])
+    etag = PAYLOADS.range_etag(page_numbers) + ('-gzip' if gzipped else '')
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'Vary': 'Accept-Encoding',
+        'X-Accel-Buffering': 'no'  # let proxies pass lines through as they are produced
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    
+    lines = PAYLOADS.iter_ndjson(page_numbers)
+    if gzipped:
+        headers['Content-Encoding'] = 'gzip'
+        lines = gzip_stream(lines)
+    return Response(lines, mimetype='application/x-ndjson', headers=headers)
+
+def export_response(chunks, mimetype, extension):
+    """Stream an export as an attachment, gzip-encoded when the client accepts it."""
+    headers = {
+        'Content-Disposition': f'attachment; filename=recitations_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}',
+        'Vary': f'Accept-Encoding, {AUTH_HEADER}'
+    }
+    chunks = stream_in_database(chunks)
+    if request.accept_encodings['gzip']:
+        headers['Content-Encoding'] = 'gzip'
+        chunks = gzip_stream(chunks)
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
 @app.route('/api/recitations/export/csv', methods=['GET'])
 def export_recitations_csv_endpoint():
-    """Export all recitations to CSV."""
+    """Export all recitations to CSV, streamed from the database cursor."""
     try:
-        import tempfile
-        import os
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as tmp_file:
-            file_path = tmp_file.name
-        
-        # Export to CSV
-        success = export_recitations_to_csv(file_path)
-        
-        if success:
-            from flask import send_file
-            return send_file(
-                file_path,
-                as_attachment=True,
-                download_name=f'recitations_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-                mimetype='text/csv'
-            )
-        else:
-            return jsonify({'error': 'Failed to export recitations'}), 500
-            
+        return export_response(stream_recitations_csv(), 'text/csv', 'csv')
+    except Exception as e:
+        return jsonify({'error': f'Failed to export recitations: {str(e)}'}), 500
+
+@app.route('/api/recitations/export/ndjson', methods=['GET'])
+def export_recitations_ndjson_endpoint():
+    """Export all recitations as newline-delimited JSON, streamed from the database cursor."""
+    try:
+        return export_response(stream_recitations_ndjson(), 'application/x-ndjson', 'ndjson')
     except Exception as e:
         return jsonify({'error': f'Failed to export recitations: {str(e)}'}), 500
 
+BACKUPS = BackupManager()
+
 @app.route('/api/recitations/backup', methods=['POST'])
 def backup_database_endpoint():
-    """Create a backup of the database."""
+    """Start an online backup of the database on the background worker."""
     try:
-        import tempfile
-        import os
-        
-        # Create backup directory if it doesn't exist
-        backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
+        data = request.get_json(silent=True) or {}
+        compress = bool(data.get('compress', request.args.get('compress', type=int, default=0)))
         
-        # Generate backup filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = os.path.join(backup_dir, f'hifz_tracker_backup_{timestamp}.db')
-        
-        # Create backup
-        success = backup_database(backup_path)
-        
-        if success:
-            return jsonify({
-                'message': 'Database backup created successfully',
-                'backup_path': backup_path
-            })
-        else:
-            return jsonify({'error': 'Failed to create backup'}), 500
+        job = BACKUPS.start(compress=compress)
+        return jsonify({
+            'message': 'Database backup started',
+            'job': job
+        }), 202
             
     except Exception as e:
         return jsonify({'error': f'Failed to create backup: {str(e)}'}), 500
 
+@app.route('/api/recitations/backup/<job_id>', methods=['GET'])
+def backup_status_endpoint(job_id):
+    """Get the status and progress of a backup job."""
+    job = BACKUPS.get(job_id, current_database())
+    if not job:
+        return jsonify({'error': 'Backup job not found'}), 404
+    return jsonify(job)
+
 if __name__ == "__main__":
+    # Development server; use serve.py in production
+    import threading
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,170 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from database import DB_PATH, backup_database, current_database, use_database
+
+BACKUP_DIR = os.path.join(os.path.dirname(__file__), 'backups')
+BACKUP_PREFIX = 'hifz_tracker_backup_'
+BACKUP_RETENTION = 10  # most recent backups kept; older ones are rotated out
+MAX_TRACKED_JOBS = 100
+JOBS_SUBDIR = 'jobs'  # job status files, one JSON file per job, inside each backup directory
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def rotate_backups(backup_dir: str = BACKUP_DIR, keep: int = BACKUP_RETENTION) -> List[str]:
+    """Delete all but the ``keep`` newest backups; returns the removed paths."""
+    if not os.path.isdir(backup_dir):
+        return []
+    backups = sorted(
+        name for name in os.listdir(backup_dir)
+        if name.startswith(BACKUP_PREFIX) and name.endswith(('.db', '.db.gz'))
+    )
+    removed = []
+    for name in backups[:max(0, len(backups) - keep)]:
+        path = os.path.join(backup_dir, name)
+        os.remove(path)
+        removed.append(path)
+    return removed
+
+
+def create_backup(
+    compress: bool = False,
+    backup_dir: str = BACKUP_DIR,
+    keep: int = BACKUP_RETENTION,
+    progress=None
+) -> Optional[str]:
+    """Back up the database into ``backup_dir``, optionally gzipped, then rotate.
+
+    Returns the backup path, or None if the backup failed.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    # Microseconds keep names unique and in chronological order for rotation
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    backup_path = os.path.join(backup_dir, f'{BACKUP_PREFIX}{timestamp}.db')
+
+    if not backup_database(backup_path, progress):
+        return None
+
+    if compress:
+        with open(backup_path, 'rb') as source, gzip.open(backup_path + '.gz.partial', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(backup_path + '.gz.partial', backup_path + '.gz')
+        os.remove(backup_path)
+        backup_path += '.gz'
+
+    rotate_backups(backup_dir, keep)
+    return backup_path
+
+
+class BackupManager:
+    """Runs backups on a single background worker and tracks them as jobs.
+
+    Job records are JSON files in the backup directory rather than process
+    memory, so under a pre-forked server any worker can answer a status poll
+    for a job another worker started. A user's shard has its own backup
+    directory, so its jobs are only visible to requests routed to that shard.
+    """
+
+    def __init__(self, backup_dir: str = BACKUP_DIR, keep: int = BACKUP_RETENTION):
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup')
+        self._lock = threading.Lock()
+
+    def backup_dir_for(self, database: str) -> str:
+        """Backup directory of a database (a user's shard goes to its own subdirectory)."""
+        if database == DB_PATH:
+            return self.backup_dir
+        return os.path.join(self.backup_dir, os.path.splitext(os.path.basename(database))[0])
+
+    def start(self, compress: bool = False) -> Dict[str, Any]:
+        """Queue a backup of the current database."""
+        database = current_database()
+        backup_dir = self.backup_dir_for(database)
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'progress': 0.0,
+            'compress': compress,
+            'backup_path': None,
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'finished_at': None
+        }
+        with self._lock:
+            self._write(backup_dir, job)
+            self._prune(backup_dir)
+        self._executor.submit(self._run, job['id'], database, backup_dir, compress)
+        return dict(job)
+
+    def get(self, job_id: str, database: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The job backing up ``database`` (default: the current one), or None if unknown."""
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        return self._read(self.backup_dir_for(database or current_database()), job_id)
+
+    @staticmethod
+    def _job_path(backup_dir: str, job_id: str) -> str:
+        return os.path.join(backup_dir, JOBS_SUBDIR, f'{job_id}.json')
+
+    def _read(self, backup_dir: str, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._job_path(backup_dir, job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, backup_dir: str, job: Dict[str, Any]):
+        # Write then rename, so a reader in another worker never sees half a file
+        path = self._job_path(backup_dir, job['id'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.partial', 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(path + '.partial', path)
+
+    def _prune(self, backup_dir: str):
+        """Forget the oldest finished jobs so the job directory stays bounded."""
+        jobs_dir = os.path.join(backup_dir, JOBS_SUBDIR)
+        jobs = [job for job in (
+            self._read(backup_dir, name[:-len('.json')])
+            for name in os.listdir(jobs_dir) if name.endswith('.json')
+        ) if job]
+        finished = sorted((job for job in jobs if job['finished_at']), key=lambda job: job['created_at'])
+        for job in finished[:max(0, len(jobs) - MAX_TRACKED_JOBS)]:
+            os.remove(self._job_path(backup_dir, job['id']))
+
+    def _update(self, backup_dir: str, job_id: str, **changes):
+        with self._lock:
+            job = self._read(backup_dir, job_id)
+            job.update(changes)
+            self._write(backup_dir, job)
+
+    def _run(self, job_id: str, database: str, backup_dir: str, compress: bool):
+        self._update(backup_dir, job_id, status='running')
+
+        def progress(remaining, total):
+            self._update(backup_dir, job_id, progress=round(1 - remaining / total, 4) if total else 1.0)
+
+        try:
+            # Worker threads don't inherit the request's context, so select the database here
+            with use_database(database):
+                backup_path = create_backup(compress, backup_dir, self.keep, progress)
+        except Exception as e:
+            backup_path = None
+            error = str(e)
+        else:
+            error = None if backup_path else 'Backup failed'
+
+        finished_at = datetime.now().isoformat()
+        if backup_path:
+            self._update(backup_dir, job_id, status='completed', progress=1.0, backup_path=backup_path, finished_at=finished_at)
+        else:
+            self._update(backup_dir, job_id, status='failed', error=error, finished_at=finished_at)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmark the QUL and recitation APIs against a synthetic recitation history.
+
+A scratch tracker database is filled with a generated history (pages
+weighted towards the recently memorized end, realistic rating and mistake
+distributions, dates spread over past years), then every target is timed:
+
+    http.*   Flask endpoints, in-process through the test client, or against
+             a running server with --url (e.g. one started by serve.py)
+    db.*     the database.py functions behind them
+
+Each target is measured cold (in-process caches, payloads and pooled
+connections dropped before every sample) and warm at each concurrency
+level. Results are written as JSON; --compare checks them against an
+earlier run and exits 1 if any p50/p95 regressed beyond the threshold.
+
+Usage:
+    python benchmark.py                                # 10k rows -> benchmark_results.json
+    python benchmark.py --rows 1000000 --output big.json
+    python benchmark.py --only http.page,db. --concurrency 1,8
+    python benchmark.py --compare baseline.json       # run, then compare
+    python benchmark.py --compare baseline.json --against new.json  # compare two files only
+    python benchmark.py --url http://127.0.0.1:5000    # time a running server (warm, read-only)
+
+In-process concurrency shares one interpreter, so it measures contention
+rather than scaling; use --url against serve.py for multi-core numbers.
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import database
+
+RATING_WEIGHTS = {'Perfect': 0.25, 'Good': 0.35, 'Okay': 0.2, 'Bad': 0.12, 'Rememorize': 0.08}
+MEAN_MISTAKES = {'Perfect': 0, 'Good': 0.5, 'Okay': 2, 'Bad': 4, 'Rememorize': 8}
+MAX_MISTAKES = 30
+HOTSPOT_WORDS = 3      # words per page that attract half of its mistakes
+HOTSPOT_SHARE = 0.5
+HISTORY_DAYS = 3 * 365
+LOAD_BATCH = 10000
+
+DEFAULT_CONCURRENCY = [1, 4, 16]
+COLD_SAMPLES = 5
+REGRESSION_THRESHOLD = 0.2   # 20% slower p50/p95 counts as a regression
+REGRESSION_MIN_MS = 0.1      # ...unless the difference is below this (timer noise)
+
+
+# --- Synthetic history ---
+def generate_recitations(mushaf, metadata, count: int, seed: int = 0):
+    """Yield ``count`` recitation dicts in date order, reproducible for a given seed.
+
+    Pages are weighted towards the end of the Mushaf (memorized first, so
+    revised most), ratings follow RATING_WEIGHTS and mistakes scale with the
+    rating, half of them on a few hard words per page.
+    """
+    rng = random.Random(seed)
+    pages = list(range(1, mushaf.page_count + 1))
+    page_weights = [1 / (1 + (mushaf.page_count - page) / 60) for page in pages]
+    ratings = list(RATING_WEIGHTS)
+    page_info = {page: metadata.page_info(page) for page in pages}
+    page_words = {page: list(mushaf.page_word_ids(page)) for page in pages}
+    hotspots = {page: rng.sample(words, min(HOTSPOT_WORDS, len(words))) for page, words in page_words.items()}
+
+    start = datetime.now() - timedelta(days=HISTORY_DAYS)
+    step = HISTORY_DAYS * 86400 / max(count, 1)
+    chosen_pages = rng.choices(pages, weights=page_weights, k=count)
+    chosen_ratings = rng.choices(ratings, weights=[RATING_WEIGHTS[r] for r in ratings], k=count)
+
+    for i, (page, rating) in enumerate(zip(chosen_pages, chosen_ratings)):
+        mean = MEAN_MISTAKES[rating]
+        mistakes = []
+        if mean:
+            for _ in range(min(int(rng.expovariate(1 / mean)), MAX_MISTAKES)):
+                pool = hotspots[page] if rng.random() < HOTSPOT_SHARE else page_words[page]
+                mistakes.append(rng.choice(pool))
+        recited_at = start + timedelta(seconds=i * step + rng.uniform(0, step))
+        yield {
+            'page_number': page,
+            'surah_name': page_info[page]['surah_names'][0],
+            'juz': page_info[page]['juz'],
+            'rating': rating,
+            'manual_mistakes': mistakes or None,
+            'notes': None,
+            'recitation_date': recited_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+def load_history(mushaf, metadata, count: int, seed: int) -> int:
+    loaded = 0
+    batch = []
+    with database.bulk_recitation_load() as insert:
+        for recitation in generate_recitations(mushaf, metadata, count, seed):
+            batch.append(recitation)
+            if len(batch) == LOAD_BATCH:
+                loaded += insert(batch)
+                batch = []
+        if batch:
+            loaded += insert(batch)
+    return loaded
+
+
+# --- Measurement ---
+class Target(NamedTuple):
+    name: str
+    run: Callable[[int], Any]   # one operation; the argument varies the input
+    iterations: int
+    writes: bool = False
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def summarize(latencies: List[float], wall: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'mean_ms': round(1000 * sum(latencies) / len(latencies), 3),
+        'p50_ms': round(1000 * percentile(latencies, 0.5), 3),
+        'p95_ms': round(1000 * percentile(latencies, 0.95), 3),
+        'p99_ms': round(1000 * percentile(latencies, 0.99), 3),
+        'max_ms': round(1000 * latencies[-1], 3),
+        'ops_per_sec': round(len(latencies) / wall, 1) if wall else None
+    }
+
+def measure(target: Target, concurrency: int, offset: int = 0) -> Dict[str, Any]:
+    def timed(i):
+        started = time.perf_counter()
+        target.run(offset + i)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        latencies = [timed(i) for i in range(target.iterations)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed, range(target.iterations)))
+    return summarize(latencies, time.perf_counter() - started)
+
+def measure_cold(target: Target, reset: Callable[[], None], samples: int = COLD_SAMPLES) -> Dict[str, Any]:
+    latencies = []
+    for i in range(samples):
+        reset()
+        started = time.perf_counter()
+        target.run(i)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies, sum(latencies))
+
+
+# --- Targets ---
+class InProcessClient:
+    """The Flask test client, one per thread."""
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[dict] = None) -> int:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.open(path, method=method, json=body, headers={'Accept-Encoding': 'gzip'})
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {path}: HTTP {response.status_code}')
+        data = response.get_data()
+        return json.loads(data)['id'] if method == 'POST' and path == '/api/recitations' else len(data)
+
+
+class RemoteClient:
+    """Plain HTTP against a running server."""
+
+    def __init__(self, base_url: str):
+        self._base_url = base_url.rstrip('/')
+
+    def request(self, method: str, path: str, body: Optional[dict] = None) -> int:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self._base_url + path, data=data, method=method, headers={
+            'Accept-Encoding': 'gzip',
+            'Content-Type': 'application/json'
+        })
+        with urllib.request.urlopen(request) as response:
+            payload = response.read()
+        return json.loads(payload)['id'] if method == 'POST' and path == '/api/recitations' else len(payload)
+
+
+def http_targets(client, page_count: int, ids: List[int], since: int, export_iterations: int) -> List[Target]:
+    created = queue.Queue()  # ids from the create target, consumed by update and delete
+
+    def create(i):
+        created.put(client.request('POST', '/api/recitations', {
+            'page_number': i % page_count + 1, 'rating': 'Good', 'manual_mistakes': [i % 50 + 1]
+        }))
+
+    def created_id():
+        try:
+            return created.get_nowait()
+        except queue.Empty:
+            raise RuntimeError('http.recitations.create must run before update and delete') from None
+
+    def update(i):
+        recitation_id = created_id()
+        client.request('PUT', f'/api/recitations/{recitation_id}', {'notes': f'benchmark {i}'})
+        created.put(recitation_id)
+
+    def delete(i):
+        client.request('DELETE', f'/api/recitations/{created_id()}')
+
+    get = lambda path: (lambda i: client.request('GET', path(i)))
+    return [
+        Target('http.page', get(lambda i: f'/api/quran/page/{i % page_count + 1}'), 500),
+        Target('http.page.msgpack', get(lambda i: f'/api/quran/page/{i % page_count + 1}?format=msgpack'), 500),
+        Target('http.juz', get(lambda i: f'/api/quran/juz/{i % 30 + 1}'), 60),
+        Target('http.surah', get(lambda i: f'/api/quran/surah/{i % 114 + 1}'), 114),
+        Target('http.pages.stream', get(lambda i: f'/api/quran/pages?from={i % 600 + 1}&to={i % 600 + 10}'), 100),
+        Target('http.meta', get(lambda i: '/api/quran/meta'), 200),
+        Target('http.recitations.create', create, 200, writes=True),
+        Target('http.recitations.get', get(lambda i: f'/api/recitations/{ids[i % len(ids)]}'), 500),
+        Target('http.recitations.update', update, 200, writes=True),
+        Target('http.recitations.delete', delete, 200, writes=True),
+        Target('http.recitations.list', get(lambda i: f'/api/recitations?limit=50&offset={i % 10 * 50}'), 200),
+        Target('http.recitations.list.page', get(lambda i: f'/api/recitations?limit=50&page_number={i % page_count + 1}'), 200),
+        Target('http.recitations.stats', get(lambda i: '/api/recitations/stats'), 200),
+        Target('http.recitations.changes', get(lambda i: f'/api/recitations/changes?since={since}'), 100),
+        Target('http.analytics.mistakes', get(lambda i: f'/api/analytics/mistakes?juz={i % 30 + 1}'), 60),
+        Target('http.revision.due', get(lambda i: '/api/revision/due?limit=20'), 100),
+        Target('http.export.csv', get(lambda i: '/api/recitations/export/csv'), export_iterations),
+        Target('http.export.ndjson', get(lambda i: '/api/recitations/export/ndjson'), export_iterations),
+    ]
+
+def db_targets(page_count: int, ids: List[int], since: int, export_iterations: int) -> List[Target]:
+    return [
+        Target('db.get_recitation', lambda i: database.get_recitation(ids[i % len(ids)]), 2000),
+        Target('db.get_all_recitations', lambda i: database.get_all_recitations(limit=50, offset=i % 10 * 50), 500),
+        Target('db.get_all_recitations.page', lambda i: database.get_all_recitations(page_number=i % page_count + 1, limit=50), 500),
+        Target('db.count_recitations', lambda i: database.count_recitations(rating='Bad'), 500),
+        Target('db.get_recitation_stats', lambda i: database.get_recitation_stats(), 500),
+        Target('db.get_mistake_frequencies', lambda i: database.get_mistake_frequencies(i % page_count + 1, i % page_count + 20), 200),
+        Target('db.get_recitation_changes', lambda i: database.get_recitation_changes(since), 200),
+        Target('db.create_recitation', lambda i: database.create_recitation(i % page_count + 1, 'Benchmark', 1, 'Okay', [i % 50 + 1]), 500, writes=True),
+        Target('db.stream_recitations_ndjson', lambda i: sum(len(chunk) for chunk in database.stream_recitations_ndjson()), export_iterations),
+    ]
+
+
+# --- Comparison ---
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Lines describing every p50/p95 regression from ``baseline`` to ``current``."""
+    regressions = []
+    for name, modes in current['results'].items():
+        for mode, stats in modes.items():
+            before = baseline['results'].get(name, {}).get(mode)
+            if not before:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                old, new = before[metric], stats[metric]
+                if new > old * (1 + threshold) and new - old > REGRESSION_MIN_MS:
+                    regressions.append(f"{name} {mode} {metric[:3]} {old:.3f}ms -> {new:.3f}ms (+{100 * (new / old - 1):.0f}%)")
+    return regressions
+
+def report_comparison(baseline_path: str, current: Dict[str, Any], threshold: float) -> int:
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline['meta'].get('rows') != current['meta'].get('rows'):
+        print(f"⚠️  Baseline has {baseline['meta'].get('rows')} rows, this run {current['meta'].get('rows')}")
+    regressions = compare_results(baseline, current, threshold)
+    for line in regressions:
+        print(f"❌ {line}")
+    if regressions:
+        print(f"❌ {len(regressions)} regressions over {threshold:.0%} against {baseline_path}")
+        return 1
+    print(f"✅ No regressions over {threshold:.0%} against {baseline_path}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the QUL and recitation APIs on a synthetic history.')
+    parser.add_argument('--rows', type=int, default=10000, help='recitations to generate (1k to 1M)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the generated history')
+    parser.add_argument('--concurrency', default=','.join(map(str, DEFAULT_CONCURRENCY)), help='comma-separated thread counts')
+    parser.add_argument('--only', help='comma-separated target name prefixes, e.g. http.page,db.')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--writes', action='store_true', help='with --url: also run the create/update/delete targets')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare with an earlier results file; exits 1 on regression')
+    parser.add_argument('--against', metavar='RESULTS', help='with --compare: compare this file instead of running')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='relative slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    if args.against:
+        if not args.compare:
+            parser.error('--against needs --compare')
+        with open(args.against) as results_file:
+            return report_comparison(args.compare, json.load(results_file), args.threshold)
+
+    concurrency_levels = [int(level) for level in args.concurrency.split(',')]
+    scratch = tempfile.TemporaryDirectory(prefix='hifz_benchmark_')
+    if not args.url:
+        # Everything below runs against a scratch database, never the real one
+        database.DB_PATH = os.path.join(scratch.name, 'benchmark.db')
+        database.init_database()
+
+    print("🔄 Loading the app...")
+    import app as app_module
+
+    rows = args.rows
+    if not args.url:
+        print(f"🔄 Generating {rows} recitations...")
+        started = time.perf_counter()
+        load_history(app_module.MUSHAF, app_module.METADATA, rows, args.seed)
+        app_module.init_revision_schedule()
+        with database.db_connection() as conn:
+            conn.execute('ANALYZE')
+        print(f"✅ Loaded in {time.perf_counter() - started:.1f}s")
+
+    page_count = app_module.MUSHAF.page_count
+    client = RemoteClient(args.url) if args.url else InProcessClient(app_module.app)
+    if args.url:
+        listing = json.loads(urllib.request.urlopen(f"{args.url.rstrip('/')}/api/recitations?limit=500").read())
+        ids, rows = [r['id'] for r in listing['recitations']], listing['total']
+        since = json.loads(urllib.request.urlopen(f"{args.url.rstrip('/')}/api/recitations/changes?limit=1").read())['head']
+    else:
+        ids, since = list(range(1, rows + 1)), database.get_data_version()
+    since = max(0, since - 100)
+    if not ids:
+        print("❌ No recitations to read; load some first")
+        return 1
+
+    export_iterations = 3 if rows <= 100000 else 1
+    targets = http_targets(client, page_count, ids, since, export_iterations)
+    if not args.url:
+        targets += db_targets(page_count, ids, since, export_iterations)
+    elif not args.writes:
+        # Never write to a real server's data unless asked to
+        targets = [target for target in targets if not target.writes]
+    if args.only:
+        prefixes = args.only.split(',')
+        selected = [target for target in targets if any(target.name.startswith(prefix) for prefix in prefixes)]
+        if any(target.name in ('http.recitations.update', 'http.recitations.delete') for target in selected):
+            prefixes.append('http.recitations.create')  # they work on the rows it creates
+        targets = [target for target in targets if any(target.name.startswith(prefix) for prefix in prefixes)]
+
+    def reset():
+        # Drop everything built in-process so the next call starts cold
+        app_module.CACHE.clear()
+        app_module.PAYLOADS = app_module.PayloadStore(app_module.build_page_data)
+        database.close_all_pools()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for target in targets:
+        modes = {}
+        if not args.url:
+            modes['cold'] = measure_cold(target, reset)
+        measure(target, 1)  # warm-up pass, not recorded
+        for offset, level in enumerate(concurrency_levels, start=1):
+            modes[f'warm_c{level}'] = measure(target, level, offset * target.iterations)
+        results[target.name] = modes
+        summary = ', '.join(f"{mode} p50 {stats['p50_ms']:.2f}ms" for mode, stats in modes.items())
+        print(f"✅ {target.name}: {summary}")
+
+    output = {
+        'meta': {
+            'rows': rows,
+            'seed': args.seed,
+            'url': args.url,
+            'concurrency': concurrency_levels,
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(output, output_file, indent=2)
+    print(f"✅ Wrote {args.output}")
+    scratch.cleanup()
+
+    if args.compare:
+        return report_comparison(args.compare, output, args.threshold)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
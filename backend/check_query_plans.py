@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for the recitations list and count queries.
+
+Runs EXPLAIN QUERY PLAN over every filter / order_by / cursor combination
+that GET /api/recitations allows. It fails if any of them falls back to a
+full table scan or a temp B-tree sort, or if a filtered query is not served
+by an index.
+
+Usage:
+    python check_query_plans.py            # fresh schema in a temporary database
+    python check_query_plans.py --db PATH  # an existing database (e.g. after ANALYZE)
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import database
+from database import (
+    FILTER_FIELDS, ORDER_FIELDS, init_database, get_db_connection,
+    build_recitations_query, build_count_query, encode_cursor
+)
+
+# Representative values; the plan does not depend on them
+SAMPLE_VALUES = {
+    'page_number': 1,
+    'surah_name': 'Al-Baqarah',
+    'juz': 1,
+    'rating': 'Good',
+    'recitation_date': '2024-01-01 00:00:00',
+    'created_at': '2024-01-01 00:00:00'
+}
+
+def plan_problems(plan, filtered):
+    """Return the reasons a plan is unacceptable (empty if it is fine)."""
+    problems = []
+    for detail in plan:
+        if 'TEMP B-TREE' in detail:
+            problems.append('temp sort')
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            problems.append('full table scan')
+    if filtered and not any(detail.startswith('SEARCH') for detail in plan):
+        problems.append('filters not served by an index')
+    return problems
+
+def explain(conn, query, params):
+    return [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+
+def iter_cases():
+    """Yield (label, query, params, filtered) for every allowed query shape."""
+    for size in range(len(FILTER_FIELDS) + 1):
+        for filter_fields in itertools.combinations(FILTER_FIELDS, size):
+            filters = {field: SAMPLE_VALUES[field] for field in filter_fields}
+            label_filters = ','.join(filter_fields) or '-'
+
+            query, params = build_count_query(**filters)
+            yield f'count [{label_filters}]', query, params, bool(filters)
+
+            for field, direction in itertools.product(ORDER_FIELDS, ('ASC', 'DESC')):
+                order_by = f'{field} {direction}'
+                cursor = encode_cursor({field: SAMPLE_VALUES[field], 'id': 1}, order_by)
+                for use_cursor in (False, True):
+                    query, params = build_recitations_query(
+                        limit=50, order_by=order_by, cursor=cursor if use_cursor else None, **filters
+                    )
+                    label = f'list [{label_filters}] order_by={order_by}{" +cursor" if use_cursor else ""}'
+                    yield label, query, params, bool(filters)
+
+def check(conn, verbose=False):
+    failures = 0
+    total = 0
+    for label, query, params, filtered in iter_cases():
+        total += 1
+        plan = explain(conn, query, params)
+        problems = plan_problems(plan, filtered)
+        if problems:
+            failures += 1
+            print(f"❌ {label}: {', '.join(sorted(set(problems)))}")
+            for detail in plan:
+                print(f"     {detail}")
+        elif verbose:
+            print(f"✅ {label}: {' | '.join(plan)}")
+    return total, failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Check recitation query plans for scans and temp sorts.')
+    parser.add_argument('--db', help='database to check (default: fresh schema in a temporary file)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan, not only failures')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DB_PATH = args.db or os.path.join(tmp_dir, 'plan_check.db')
+        if not args.db:
+            init_database()
+
+        conn = get_db_connection()
+        try:
+            total, failures = check(conn, args.verbose)
+        finally:
+            conn.close()
+
+    if failures:
+        print(f"\n{failures} of {total} query shapes regressed")
+        return 1
+    print(f"✅ All {total} query shapes pass: no full scans or temp sorts, filters use an index")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,478 @@
 import sqlite3
 import os
 import json
+import math
+import base64
+import contextvars
+import hashlib
+import queue
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 
+import metrics
+
 # Database file path
 DB_PATH = os.path.join(os.path.dirname(__file__), 'hifz_tracker.db')
 
-def get_db_connection():
+# Connection tuning applied to every connection
+POOL_MAX_IDLE = 8
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous = NORMAL',  # safe with WAL: only the last commits can be lost on power failure
+    'PRAGMA cache_size = -16000',   # 16 MB page cache
+    'PRAGMA mmap_size = 268435456', # 256 MB memory-mapped I/O
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA temp_store = MEMORY',
+)
+
+# Columns the recitations list can be filtered (by equality) and ordered by.
+# Only orders RECITATION_INDEXES serve for every filter are allowed, so no
+# list (and no cursor page) sorts the rows it selects.
+FILTER_FIELDS = ['page_number', 'surah_name', 'juz', 'rating']
+ORDER_FIELDS = ['recitation_date']
+
+# Indexes on recitations, checked by check_query_plans.py. Lists are read in
+# the default order (recitation_date), so each equality filter leads a
+# (filter, recitation_date) index and rows come out already sorted; id is the
+# rowid, which SQLite appends to every index, so the keyset tie-break is
+# covered too. Every index is maintained on each write, so keep this list
+# short.
+RECITATION_INDEXES = {
+    'idx_recitations_date': ('recitation_date',),  # unfiltered lists, recent activity
+    'idx_recitations_page_date': ('page_number', 'recitation_date'),  # also the revision replay
+    'idx_recitations_surah_date': ('surah_name', 'recitation_date'),
+    'idx_recitations_juz_date': ('juz', 'recitation_date'),
+    'idx_recitations_rating_date': ('rating', 'recitation_date'),
+}
+
+# Dimensions kept in the recitation_stats summary: kind -> key expression ({row} is NEW or OLD)
+STATS_DIMENSIONS = {
+    'rating': '{row}.rating',
+    'page': '{row}.page_number',
+    'surah': '{row}.surah_name',
+    'day': 'date({row}.recitation_date)'
+}
+
+def _stats_trigger_body(row: str, delta: int) -> str:
+    """Trigger statements adding ``delta`` to every summary bucket of ``row``."""
+    statements = []
+    for kind, expression in STATS_DIMENSIONS.items():
+        key = expression.format(row=row)
+        if delta > 0:
+            statements.append(
+                f"INSERT INTO recitation_stats (kind, key, count) VALUES ('{kind}', {key}, {delta}) "
+                f"ON CONFLICT(kind, key) DO UPDATE SET count = count + {delta};"
+            )
+        else:
+            statements.append(f"UPDATE recitation_stats SET count = count + {delta} WHERE kind = '{kind}' AND key = {key};")
+            statements.append(f"DELETE FROM recitation_stats WHERE kind = '{kind}' AND key = {key} AND count <= 0;")
+    return '\n            '.join(statements)
+
+# Summary recomputed from scratch, used by rebuild and verify
+STATS_FROM_RECITATIONS_SQL = ' UNION ALL '.join(
+    f"SELECT '{kind}' AS kind, {expression.format(row='recitations')} AS key, COUNT(*) AS count "
+    f"FROM recitations GROUP BY key"
+    for kind, expression in STATS_DIMENSIONS.items()
+)
+
+# --- Database routing ---
+# The tracker database the current request or thread works on: DB_PATH, or a
+# user's shard (see open_user_database). A context variable, so concurrent
+# requests for different users never see each other's database.
+_current_database = contextvars.ContextVar('current_database', default=None)
+
+def current_database() -> str:
+    """Path of the tracker database in use; DB_PATH unless a user's shard is selected."""
+    return _current_database.get() or DB_PATH
+
+def set_current_database(path: Optional[str]):
+    """Route this context to ``path`` (None for DB_PATH); returns a token for reset_current_database()."""
+    return _current_database.set(path)
+
+def reset_current_database(token):
+    _current_database.reset(token)
+
+@contextmanager
+def use_database(path: Optional[str]):
+    """Run the block against ``path``: ``with use_database(shard): create_recitation(...)``"""
+    token = set_current_database(path)
+    try:
+        yield path
+    finally:
+        reset_current_database(token)
+
+def get_db_connection(db_path: Optional[str] = None):
     """Create and return a database connection with proper configuration."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = metrics.connect('tracker', db_path or current_database(), cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
     conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    try:
+        conn.execute('SELECT pow(2, 2)')
+    except sqlite3.OperationalError:
+        # SQLite built without math functions; analytics queries need pow()
+        conn.create_function('pow', 2, math.pow, deterministic=True)
     return conn
 
+class ConnectionPool:
+    """Pool of configured connections to the tracker database.
+
+    A connection is handed to one thread at a time and returned afterwards, so
+    threads reuse warm connections (page cache, prepared statements) instead
+    of reconnecting per call. Up to ``max_idle`` connections are kept.
+    """
+
+    def __init__(self, connect=get_db_connection, max_idle: int = POOL_MAX_IDLE):
+        self._connect = connect
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._retired = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            try:
+                conn.in_transaction  # raises if the connection was closed
+                return conn
+            except sqlite3.ProgrammingError:
+                continue
+
+    def _release(self, conn: sqlite3.Connection):
+        if self._retired:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error."""
+        conn = self._acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def retire(self):
+        """Close idle connections now and borrowed ones when they come back."""
+        self._retired = True
+        self.close_all()
+
+SHARD_POOL_MAX_OPEN = 64  # user shards with pooled connections per process
+SHARD_POOL_MAX_IDLE = 2   # idle connections kept per user shard
+
+class PoolRegistry:
+    """One ConnectionPool per database file, for the shared database and user shards.
+
+    The shared database keeps its pool for good; at most ``max_open`` shard
+    pools are kept, and the least recently used one is retired (its
+    connections closed) to make room, so open file handles stay bounded
+    however many users there are.
+    """
+
+    def __init__(self, max_open: int = SHARD_POOL_MAX_OPEN):
+        self.max_open = max_open
+        self._pools: 'OrderedDict[str, ConnectionPool]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> ConnectionPool:
+        with self._lock:
+            pool = self._pools.get(path)
+            if pool is not None:
+                self._pools.move_to_end(path)
+                return pool
+            if path == DB_PATH:
+                pool = ConnectionPool(lambda: get_db_connection(path))
+            else:
+                pool = ConnectionPool(lambda: get_db_connection(path), max_idle=SHARD_POOL_MAX_IDLE)
+            self._pools[path] = pool
+            shards = [key for key in self._pools if key != DB_PATH]
+            for key in shards[:max(0, len(shards) - self.max_open)]:
+                self._pools.pop(key).retire()
+            return pool
+
+    def open_count(self) -> int:
+        with self._lock:
+            return len(self._pools)
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.retire()
+
+_pools = None
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+def _registry() -> PoolRegistry:
+    """The process's pools. A forked worker gets fresh ones: SQLite
+    connections must not be used across fork, so inherited ones are left alone."""
+    global _pools, _pools_pid
+    if _pools is None or _pools_pid != os.getpid():
+        with _pools_lock:
+            if _pools is None or _pools_pid != os.getpid():
+                _pools = PoolRegistry()
+                _pools_pid = os.getpid()
+    return _pools
+
+def get_pool() -> ConnectionPool:
+    """The pool for the current database (see current_database)."""
+    return _registry().get(current_database())
+
+def close_all_pools():
+    """Close every pooled connection, for the shared database and all shards."""
+    _registry().close_all()
+
+def db_connection():
+    """Borrow a pooled connection: ``with db_connection() as conn: ...``"""
+    return get_pool().connection()
+
+metrics.CallbackMetric(
+    'sqlite_pools_open', 'Databases with a connection pool (shared database plus open user shards).', 'gauge', [],
+    lambda: [((), _registry().open_count())]
+)
+
+# --- User shards ---
+# Each user's recitations live in their own SQLite file, so one user's
+# writes (and WAL checkpoints) never hold a lock another user waits on.
+USER_SHARD_DIR = os.path.join(os.path.dirname(__file__), 'user_data')
+USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+_initialized_shards = set()
+_shard_init_lock = threading.Lock()
+
+def user_database_path(user_id: str) -> str:
+    """Shard file for ``user_id``, fanned out over 256 directories by hash."""
+    if not isinstance(user_id, str) or not USER_ID_PATTERN.match(user_id):
+        raise ValueError('User id must be 1-64 letters, digits, underscores or hyphens')
+    user_id = user_id.lower()
+    bucket = hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:2]
+    return os.path.join(USER_SHARD_DIR, bucket, f'{user_id}.db')
+
+def open_user_database(user_id: str, initialize=None) -> str:
+    """Path of ``user_id``'s shard, creating its schema on first use in this process.
+
+    ``initialize`` runs with the shard selected (default: init_database) and
+    must be idempotent, since every process runs it once per shard.
+    """
+    path = user_database_path(user_id)
+    if path in _initialized_shards:
+        return path
+    with _shard_init_lock:
+        if path not in _initialized_shards:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with use_database(path):
+                (initialize or init_database)()
+            _initialized_shards.add(path)
+    return path
+
+# --- User tokens ---
+# Which shard a request uses comes from a bearer token the server issued
+# (python user_tokens.py add <user>), never from a user id the client names.
+# Only each token's SHA-256 is kept, in the shared database.
+USER_TOKEN_BYTES = 32
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def init_user_tokens():
+    """Create the token table in the shared database."""
+    with use_database(None), db_connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS user_tokens (
+                token_hash TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_user_tokens_user ON user_tokens(user_id)')
+
+def create_user_token(user_id: str) -> str:
+    """Issue a new token for ``user_id`` and return it; it cannot be read back later."""
+    user_database_path(user_id)  # validates the id
+    token = secrets.token_urlsafe(USER_TOKEN_BYTES)
+    with use_database(None), db_connection() as conn:
+        conn.execute(
+            'INSERT INTO user_tokens (token_hash, user_id) VALUES (?, ?)',
+            (_token_hash(token), user_id.lower())
+        )
+    return token
+
+def resolve_user_token(token: str) -> Optional[str]:
+    """The user a token was issued to, or None if it is unknown or revoked."""
+    with use_database(None), db_connection() as conn:
+        row = conn.execute('SELECT user_id FROM user_tokens WHERE token_hash = ?', (_token_hash(token),)).fetchone()
+    return row['user_id'] if row else None
+
+def revoke_user_tokens(user_id: str) -> int:
+    """Revoke every token of ``user_id``; returns how many there were."""
+    with use_database(None), db_connection() as conn:
+        return conn.execute('DELETE FROM user_tokens WHERE user_id = ?', (user_id.lower(),)).rowcount
+
+def list_user_tokens() -> List[Dict[str, Any]]:
+    """Users with tokens: [{'user_id', 'tokens', 'last_issued'}]."""
+    with use_database(None), db_connection() as conn:
+        return [dict(row) for row in conn.execute('''
+            SELECT user_id, COUNT(*) AS tokens, MAX(created_at) AS last_issued
+            FROM user_tokens GROUP BY user_id ORDER BY user_id
+        ''')]
+
+MISTAKES_INDEXES = {
+    'idx_recitation_mistakes_page_word': ('page_number', 'word_id'),
+}
+
+def _create_mistakes_indexes(cursor):
+    for index_name, columns in MISTAKES_INDEXES.items():
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON recitation_mistakes({", ".join(columns)})')
+
+def _create_recitation_indexes(cursor):
+    for index_name, columns in RECITATION_INDEXES.items():
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON recitations({", ".join(columns)})')
+
+def _drop_retired_recitation_indexes(cursor):
+    """Drop recitation indexes no longer in RECITATION_INDEXES (older, larger index sets)."""
+    cursor.execute('''
+        SELECT name FROM sqlite_master
+        WHERE type = 'index' AND tbl_name = 'recitations' AND name LIKE 'idx_recitations_%'
+    ''')
+    keep = set(RECITATION_INDEXES) | {'idx_recitations_row_version'}
+    for (index_name,) in cursor.fetchall():
+        if index_name not in keep:
+            cursor.execute(f'DROP INDEX {index_name}')
+
+STATS_TRIGGERS = ['recitation_stats_insert', 'recitation_stats_delete', 'recitation_stats_update']
+
+def _create_stats_triggers(cursor):
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recitation_stats_insert
+        AFTER INSERT ON recitations
+        BEGIN
+            {_stats_trigger_body('NEW', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recitation_stats_delete
+        AFTER DELETE ON recitations
+        BEGIN
+            {_stats_trigger_body('OLD', -1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recitation_stats_update
+        AFTER UPDATE OF page_number, surah_name, rating, recitation_date ON recitations
+        BEGIN
+            {_stats_trigger_body('OLD', -1)}
+            {_stats_trigger_body('NEW', 1)}
+        END
+    ''')
+
+MISTAKES_TRIGGERS = ['recitation_mistakes_insert', 'recitation_mistakes_delete', 'recitation_mistakes_update']
+
+def _mistakes_from_json(row: str) -> str:
+    """SELECT of recitation_mistakes rows from manual_mistakes JSON arrays.
+    
+    ``row`` is NEW inside a trigger, or 'recitations' to read the table.
+    """
+    source = '' if row == 'NEW' else f'{row}, '
+    return f'''
+            SELECT {row}.id, mistake.key, mistake.value, {row}.page_number
+            FROM {source}json_each({row}.manual_mistakes) AS mistake'''
+
+def _create_mistakes_triggers(cursor):
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recitation_mistakes_insert
+        AFTER INSERT ON recitations
+        WHEN NEW.manual_mistakes IS NOT NULL
+        BEGIN
+            INSERT INTO recitation_mistakes (recitation_id, position, word_id, page_number)
+            {_mistakes_from_json('NEW')};
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS recitation_mistakes_delete
+        AFTER DELETE ON recitations
+        WHEN OLD.manual_mistakes IS NOT NULL
+        BEGIN
+            DELETE FROM recitation_mistakes WHERE recitation_id = OLD.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recitation_mistakes_update
+        AFTER UPDATE OF manual_mistakes, page_number ON recitations
+        BEGIN
+            DELETE FROM recitation_mistakes WHERE recitation_id = OLD.id;
+            INSERT INTO recitation_mistakes (recitation_id, position, word_id, page_number)
+            {_mistakes_from_json('NEW')}
+            WHERE NEW.manual_mistakes IS NOT NULL;
+        END
+    ''')
+
+VERSION_TRIGGERS = ['recitation_version_insert', 'recitation_version_delete']
+
+# Tombstones are kept for this many versions; older ones are pruned by the
+# delete trigger, and a client syncing from before the pruned horizon
+# (sync_state.pruned_version) is told to reset
+TOMBSTONE_RETENTION_VERSIONS = 100000
+
+def _create_version_triggers(cursor):
+    # Updates are versioned by update_recitations_updated_at; its WHEN clause
+    # skips the row_version write made here
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS recitation_version_insert
+        AFTER INSERT ON recitations
+        BEGIN
+            UPDATE sync_state SET version = version + 1 WHERE id = 1;
+            UPDATE recitations SET row_version = (SELECT version FROM sync_state WHERE id = 1)
+            WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS recitation_version_delete
+        AFTER DELETE ON recitations
+        BEGIN
+            UPDATE sync_state SET version = version + 1 WHERE id = 1;
+            INSERT OR REPLACE INTO recitation_tombstones (recitation_id, version)
+            SELECT OLD.id, version FROM sync_state WHERE id = 1;
+            UPDATE sync_state SET pruned_version = COALESCE((
+                SELECT MAX(t.version) FROM recitation_tombstones t
+                WHERE t.version <= sync_state.version - {TOMBSTONE_RETENTION_VERSIONS}
+            ), pruned_version) WHERE id = 1;
+            DELETE FROM recitation_tombstones
+            WHERE version <= (SELECT pruned_version FROM sync_state WHERE id = 1);
+        END
+    ''')
+
 def init_database():
     """Initialize the database with the required schema."""
     conn = get_db_connection()
     cursor = conn.cursor()
     
+    # WAL lets dashboard reads run alongside session writes; the mode is stored in the file
+    cursor.execute('PRAGMA journal_mode = WAL')
+    
     # Create recitations table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS recitations (
@@ -32,28 +487,110 @@ def init_database():
             fixed_it_date DATETIME,
             prev_rating TEXT CHECK (prev_rating IN ('Perfect', 'Good', 'Okay', 'Bad', 'Rememorize')),
             created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            row_version INTEGER NOT NULL DEFAULT 0
         )
     ''')
     
     # Create indexes for better query performance
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recitations_page_number ON recitations(page_number)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recitations_surah_name ON recitations(surah_name)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recitations_juz ON recitations(juz)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recitations_recitation_date ON recitations(recitation_date)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recitations_rating ON recitations(rating)')
+    _create_recitation_indexes(cursor)
+    _drop_retired_recitation_indexes(cursor)
     
-    # Create trigger to update updated_at timestamp
+    # Data version: bumped by every insert, update and delete, stamped on the
+    # changed row (row_version) or on a tombstone for deleted ones
     cursor.execute('''
-        CREATE TRIGGER IF NOT EXISTS update_recitations_updated_at
-        AFTER UPDATE ON recitations
-        BEGIN
-            UPDATE recitations SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
-        END
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            pruned_version INTEGER NOT NULL DEFAULT 0 -- newest tombstone pruned
+        )
     ''')
+    cursor.execute("SELECT 1 FROM pragma_table_info('sync_state') WHERE name = 'pruned_version'")
+    if cursor.fetchone() is None:
+        cursor.execute('ALTER TABLE sync_state ADD COLUMN pruned_version INTEGER NOT NULL DEFAULT 0')
+        # The delete trigger predates pruning; recreated below
+        cursor.execute('DROP TRIGGER IF EXISTS recitation_version_delete')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recitation_tombstones (
+            recitation_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recitation_tombstones_version ON recitation_tombstones(version)')
+    
+    # Create trigger to update updated_at timestamp (and the row's version).
+    # Older databases have a version without row_version: it is replaced, and
+    # the column added, in one write transaction, so no update from another
+    # connection lands in between unversioned. Current databases skip this.
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'update_recitations_updated_at'")
+    trigger = cursor.fetchone()
+    if trigger is None or 'row_version' not in trigger[0]:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('DROP TRIGGER IF EXISTS update_recitations_updated_at')
+        cursor.execute("SELECT 1 FROM pragma_table_info('recitations') WHERE name = 'row_version'")
+        if cursor.fetchone() is None:
+            # Existing rows get versions in id order
+            cursor.execute('ALTER TABLE recitations ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0')
+            cursor.execute('UPDATE recitations SET row_version = id')
+        cursor.execute('''
+            CREATE TRIGGER update_recitations_updated_at
+            AFTER UPDATE ON recitations
+            WHEN NEW.row_version = OLD.row_version
+            BEGIN
+                UPDATE sync_state SET version = version + 1 WHERE id = 1;
+                UPDATE recitations SET updated_at = CURRENT_TIMESTAMP,
+                    row_version = (SELECT version FROM sync_state WHERE id = 1)
+                WHERE id = NEW.id;
+            END
+        ''')
+        conn.commit()
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recitations_row_version ON recitations(row_version)')
+    cursor.execute('''
+        INSERT OR IGNORE INTO sync_state (id, version)
+        SELECT 1, COALESCE(MAX(row_version), 0) FROM recitations
+    ''')
+    
+    _create_version_triggers(cursor)
+    
+    # Statistics summary kept current by triggers, so stats never scan recitations
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recitation_stats (
+            kind TEXT NOT NULL, -- rating, page, surah or day
+            key NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID
+    ''')
+    _create_stats_triggers(cursor)
+    
+    # Backfill the summary for databases created before it existed
+    cursor.execute('SELECT EXISTS (SELECT 1 FROM recitation_stats), EXISTS (SELECT 1 FROM recitations)')
+    has_stats, has_recitations = cursor.fetchone()
+    if has_recitations and not has_stats:
+        cursor.execute(f'INSERT INTO recitation_stats (kind, key, count) {STATS_FROM_RECITATIONS_SQL}')
+    
+    # Word-level mistakes, one row per entry of manual_mistakes, kept in sync by triggers
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recitation_mistakes'")
+    needs_mistakes_backfill = cursor.fetchone() is None and has_recitations
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recitation_mistakes (
+            recitation_id INTEGER NOT NULL,
+            position INTEGER NOT NULL, -- index in manual_mistakes
+            word_id INTEGER NOT NULL,
+            page_number INTEGER NOT NULL,
+            PRIMARY KEY (recitation_id, position)
+        ) WITHOUT ROWID
+    ''')
+    _create_mistakes_indexes(cursor)
+    cursor.execute('DROP INDEX IF EXISTS idx_recitation_mistakes_word')  # only served a removed lookup
+    _create_mistakes_triggers(cursor)
     
     conn.commit()
     conn.close()
+    
+    # Rows written from here on are covered by the triggers; fill in the older ones
+    if needs_mistakes_backfill:
+        backfill_recitation_mistakes()
 
 def validate_rating(rating: str) -> bool:
     """Validate that the rating is one of the allowed values."""
@@ -64,6 +601,14 @@ def validate_mistakes(mistakes: List[int]) -> bool:
     """Validate that mistakes is a list of integers (word IDs)."""
     return isinstance(mistakes, list) and all(isinstance(x, int) for x in mistakes)
 
+def validate_recitation(rating: str, manual_mistakes: Optional[List[int]] = None):
+    """Raise ValueError if a new recitation's rating or mistakes are invalid."""
+    if not validate_rating(rating):
+        raise ValueError(f"Invalid rating: {rating}. Must be one of: Perfect, Good, Okay, Bad, Rememorize")
+    
+    if manual_mistakes and not validate_mistakes(manual_mistakes):
+        raise ValueError("manual_mistakes must be a list of integers")
+
 def create_recitation(
     page_number: int,
     surah_name: str,
@@ -73,16 +618,11 @@ def create_recitation(
     notes: Optional[str] = None
 ) -> int:
     """Create a new recitation record and return its ID."""
-    if not validate_rating(rating):
-        raise ValueError(f"Invalid rating: {rating}. Must be one of: Perfect, Good, Okay, Bad, Rememorize")
-    
-    if manual_mistakes and not validate_mistakes(manual_mistakes):
-        raise ValueError("manual_mistakes must be a list of integers")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    validate_recitation(rating, manual_mistakes)
     
-    try:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
         cursor.execute('''
             INSERT INTO recitations (page_number, surah_name, juz, rating, manual_mistakes, notes)
             VALUES (?, ?, ?, ?, ?, ?)
@@ -98,27 +638,255 @@ def create_recitation(
         recitation_id = cursor.lastrowid
         conn.commit()
         return recitation_id
-    finally:
-        conn.close()
+
+INSERT_RECITATION_SQL = '''
+    INSERT INTO recitations (page_number, surah_name, juz, rating, manual_mistakes, notes, recitation_date)
+    VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+
+def _recitation_rows(recitations: List[Dict[str, Any]]) -> List[tuple]:
+    """Validate batch items and turn them into INSERT_RECITATION_SQL parameters."""
+    rows = []
+    for recitation in recitations:
+        validate_recitation(recitation['rating'], recitation.get('manual_mistakes'))
+        rows.append((
+            recitation['page_number'],
+            recitation['surah_name'],
+            recitation['juz'],
+            recitation['rating'],
+            json.dumps(recitation['manual_mistakes']) if recitation.get('manual_mistakes') else None,
+            recitation.get('notes'),
+            recitation.get('recitation_date')
+        ))
+    return rows
+
+def create_recitations_batch(recitations: List[Dict[str, Any]]) -> List[int]:
+    """Insert many recitations in one transaction and return their IDs in order.
+    
+    Every item is validated before anything is written, so the batch is
+    all-or-nothing. Items may carry a ``recitation_date`` ('YYYY-MM-DD HH:MM:SS')
+    for sessions recorded earlier; it defaults to now.
+    """
+    rows = _recitation_rows(recitations)
+    
+    if not rows:
+        return []
+    
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # IMMEDIATE takes the write lock up front, so the AUTOINCREMENT ids
+        # handed out below are contiguous and can be read back from sqlite_sequence
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.executemany(INSERT_RECITATION_SQL, rows)
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'recitations'")
+        last_id = cursor.fetchone()['seq']
+        conn.commit()
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+# Triggers other modules keep on recitations for their own derived tables
+# (the revision schedule): (trigger names, create(cursor), rebuild(conn))
+_bulk_load_triggers = []
+
+def register_bulk_load_triggers(triggers: List[str], create, rebuild):
+    """Have bulk_recitation_load drop ``triggers`` for a load, then call
+    ``create(cursor)`` and a single set-based ``rebuild(conn)`` at the end."""
+    _bulk_load_triggers.append((list(triggers), create, rebuild))
+
+@contextmanager
+def bulk_recitation_load():
+    """Load a large volume of recitations in one transaction; yields ``insert(batch) -> count``.
+    
+    Secondary indexes and the derived-table triggers (stats, mistakes,
+    versions and any registered with register_bulk_load_triggers) are dropped
+    for the load and rebuilt afterwards: building an index by sorting once is
+    far cheaper than updating it per row. Only worth it when the load is
+    comparable to the existing table. Everything happens in one transaction,
+    so readers keep the old snapshot (indexes included) and a failure rolls
+    the whole load back.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        for index_name in RECITATION_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+        for index_name in MISTAKES_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+        for trigger_name in STATS_TRIGGERS + MISTAKES_TRIGGERS + VERSION_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+        # Registered triggers are only handled where they are installed
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'recitations'")
+        installed = {row[0] for row in cursor.fetchall()}
+        derived = [entry for entry in _bulk_load_triggers if installed.intersection(entry[0])]
+        for triggers, _, _ in derived:
+            for trigger_name in triggers:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+        cursor.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'recitations'), 0)")
+        first_new_id = cursor.fetchone()[0] + 1
+        
+        def insert(batch: List[Dict[str, Any]]) -> int:
+            rows = _recitation_rows(batch)
+            cursor.executemany(INSERT_RECITATION_SQL, rows)
+            return len(rows)
+        
+        yield insert
+        
+        cursor.execute(f'''
+            INSERT INTO recitation_mistakes (recitation_id, position, word_id, page_number)
+            {_mistakes_from_json('recitations')}
+            WHERE recitations.id >= ? AND recitations.manual_mistakes IS NOT NULL
+        ''', (first_new_id,))
+        _create_recitation_indexes(cursor)
+        _create_mistakes_indexes(cursor)
+        # One version per loaded row, in id order, assigned in a single pass
+        cursor.execute('''
+            UPDATE recitations SET row_version = (SELECT version FROM sync_state WHERE id = 1) + id - ? + 1
+            WHERE id >= ?
+        ''', (first_new_id, first_new_id))
+        cursor.execute('UPDATE sync_state SET version = version + ? WHERE id = 1', (cursor.rowcount,))
+        _create_stats_triggers(cursor)
+        _create_mistakes_triggers(cursor)
+        _create_version_triggers(cursor)
+        cursor.execute('DELETE FROM recitation_stats')
+        cursor.execute(f'INSERT INTO recitation_stats (kind, key, count) {STATS_FROM_RECITATIONS_SQL}')
+        for _, create, rebuild in derived:
+            create(cursor)
+            rebuild(conn)
+        conn.commit()
 
 def get_recitation(recitation_id: int) -> Optional[Dict[str, Any]]:
     """Get a specific recitation by ID."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
         cursor.execute('SELECT * FROM recitations WHERE id = ?', (recitation_id,))
         row = cursor.fetchone()
         
         if row:
-            recitation = dict(row)
-            # Parse JSON mistakes back to list
-            if recitation['manual_mistakes']:
-                recitation['manual_mistakes'] = json.loads(recitation['manual_mistakes'])
-            return recitation
+            return _attach_mistakes(conn, [dict(row)])[0]
         return None
-    finally:
-        conn.close()
+
+MISTAKES_LOOKUP_CHUNK = 500  # ids per IN (...) lookup, well under SQLite's variable limit
+
+def _attach_mistakes(conn, recitations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace each manual_mistakes JSON string with its word ids from recitation_mistakes.
+    
+    One indexed primary-key lookup per chunk of recitations instead of a
+    json.loads per row; rows without mistakes are never looked up.
+    """
+    with_mistakes = {}
+    for recitation in recitations:
+        if recitation['manual_mistakes']:
+            recitation['manual_mistakes'] = with_mistakes[recitation['id']] = []
+    
+    ids = list(with_mistakes)
+    for start in range(0, len(ids), MISTAKES_LOOKUP_CHUNK):
+        chunk = ids[start:start + MISTAKES_LOOKUP_CHUNK]
+        rows = conn.execute(f'''
+            SELECT recitation_id, word_id FROM recitation_mistakes
+            WHERE recitation_id IN ({", ".join("?" * len(chunk))})
+            ORDER BY recitation_id, position
+        ''', chunk)
+        for recitation_id, word_id in rows:
+            with_mistakes[recitation_id].append(word_id)
+    
+    return recitations
+
+def parse_order_by(order_by: str) -> tuple:
+    """Split 'field [ASC|DESC]' into a validated (field, direction) pair."""
+    parts = order_by.split()
+    field = parts[0] if parts else ''
+    direction = parts[1].upper() if len(parts) > 1 else 'ASC'
+    if field not in ORDER_FIELDS or direction not in ('ASC', 'DESC') or len(parts) > 2:
+        raise ValueError(f"Invalid order_by: {order_by}")
+    return field, direction
+
+def encode_cursor(recitation: Dict[str, Any], order_by: str) -> str:
+    """Opaque keyset cursor pointing just past ``recitation`` in ``order_by`` order."""
+    field, direction = parse_order_by(order_by)
+    token = json.dumps([f'{field} {direction}', recitation[field], recitation['id']])
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, order_by: str) -> tuple:
+    """Return the (value, id) a cursor points past; it must match ``order_by``."""
+    field, direction = parse_order_by(order_by)
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        order, value, recitation_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if order != f'{field} {direction}':
+        raise ValueError("Cursor does not match order_by")
+    return value, recitation_id
+
+def _build_filters(
+    page_number: Optional[int] = None,
+    surah_name: Optional[str] = None,
+    juz: Optional[int] = None,
+    rating: Optional[str] = None
+) -> tuple:
+    """WHERE clause and parameters shared by the list and count queries."""
+    clauses = []
+    params = []
+    
+    if page_number is not None:
+        clauses.append('page_number = ?')
+        params.append(page_number)
+    
+    if surah_name is not None:
+        clauses.append('surah_name = ?')
+        params.append(surah_name)
+    
+    if juz is not None:
+        clauses.append('juz = ?')
+        params.append(juz)
+    
+    if rating is not None:
+        if not validate_rating(rating):
+            raise ValueError(f"Invalid rating: {rating}")
+        clauses.append('rating = ?')
+        params.append(rating)
+    
+    return clauses, params
+
+def build_recitations_query(
+    page_number: Optional[int] = None,
+    surah_name: Optional[str] = None,
+    juz: Optional[int] = None,
+    rating: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    order_by: str = 'recitation_date DESC',
+    cursor: Optional[str] = None
+) -> tuple:
+    """SQL and parameters for get_all_recitations (also used to check query plans)."""
+    field, direction = parse_order_by(order_by)
+    clauses, params = _build_filters(page_number, surah_name, juz, rating)
+    
+    if cursor is not None:
+        value, last_id = decode_cursor(cursor, order_by)
+        comparison = '<' if direction == 'DESC' else '>'
+        clauses.append(f'({field}, id) {comparison} (?, ?)')
+        params.extend([value, last_id])
+    
+    # Build query with filters
+    query = 'SELECT * FROM recitations'
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    
+    # Add ordering; id breaks ties so cursors are unambiguous
+    query += f' ORDER BY {field} {direction}, id {direction}'
+    
+    # Add pagination
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+        
+        if offset is not None and cursor is None:
+            query += ' OFFSET ?'
+            params.append(offset)
+    
+    return query, params
 
 def get_all_recitations(
     page_number: Optional[int] = None,
@@ -127,61 +895,164 @@ def get_all_recitations(
     rating: Optional[str] = None,
     limit: Optional[int] = None,
     offset: Optional[int] = None,
-    order_by: str = 'recitation_date DESC'
+    order_by: str = 'recitation_date DESC',
+    cursor: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    """Get all recitations with optional filtering and pagination."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Get all recitations with optional filtering and pagination.
     
-    try:
-        # Build query with filters
-        query = 'SELECT * FROM recitations WHERE 1=1'
-        params = []
-        
-        if page_number is not None:
-            query += ' AND page_number = ?'
-            params.append(page_number)
-        
-        if surah_name is not None:
-            query += ' AND surah_name = ?'
-            params.append(surah_name)
-        
-        if juz is not None:
-            query += ' AND juz = ?'
-            params.append(juz)
-        
-        if rating is not None:
-            if not validate_rating(rating):
-                raise ValueError(f"Invalid rating: {rating}")
-            query += ' AND rating = ?'
-            params.append(rating)
-        
-        # Add ordering
-        query += f' ORDER BY {order_by}'
-        
-        # Add pagination
-        if limit is not None:
-            query += ' LIMIT ?'
-            params.append(limit)
-            
-            if offset is not None:
-                query += ' OFFSET ?'
-                params.append(offset)
+    Pass ``cursor`` (from ``encode_cursor`` on the last row of the previous
+    page) for keyset pagination; it costs the same at any depth, unlike
+    ``offset``.
+    """
+    query, params = build_recitations_query(
+        page_number, surah_name, juz, rating, limit, offset, order_by, cursor
+    )
+    
+    with db_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        # Convert to list of dicts; mistakes come from the normalized table
+        return _attach_mistakes(conn, [dict(row) for row in rows])
+
+def build_count_query(
+    page_number: Optional[int] = None,
+    surah_name: Optional[str] = None,
+    juz: Optional[int] = None,
+    rating: Optional[str] = None
+) -> tuple:
+    """SQL and parameters for count_recitations.
+    
+    No filter, or a single page, surah or rating filter, is answered from the
+    trigger-maintained recitation_stats summary instead of counting rows.
+    """
+    clauses, params = _build_filters(page_number, surah_name, juz, rating)
+    if not clauses:
+        return "SELECT COALESCE(SUM(count), 0) FROM recitation_stats WHERE kind = 'rating'", []
+    summary = [
+        (kind, value) for kind, value in (('page', page_number), ('surah', surah_name), ('rating', rating))
+        if value is not None
+    ]
+    if len(clauses) == 1 and summary:
+        return 'SELECT COALESCE(MAX(count), 0) FROM recitation_stats WHERE kind = ? AND key = ?', list(summary[0])
+    query = 'SELECT COUNT(*) FROM recitations'
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    return query, params
+
+def count_recitations(
+    page_number: Optional[int] = None,
+    surah_name: Optional[str] = None,
+    juz: Optional[int] = None,
+    rating: Optional[str] = None
+) -> int:
+    """Count recitations matching the same filters as get_all_recitations."""
+    query, params = build_count_query(page_number, surah_name, juz, rating)
+    
+    with db_connection() as conn:
+        return conn.execute(query, params).fetchone()[0]
+
+def get_data_version() -> int:
+    """Current data version; it changes on every insert, update and delete."""
+    with db_connection() as conn:
+        return conn.execute('SELECT version FROM sync_state WHERE id = 1').fetchone()[0]
+
+CHANGES_LIMIT = 1000  # changed rows per delta sync response
+
+def get_recitation_changes(since: int, limit: int = CHANGES_LIMIT) -> Dict[str, Any]:
+    """Recitations inserted, updated or deleted after version ``since``.
+    
+    Returns at most ``limit`` changed rows, oldest change first, plus the ids
+    deleted in the same version range. ``version`` is what to pass as
+    ``since`` next time; ``has_more`` says whether to ask again straight away.
+    ``head`` is the current data version, which ``version`` reaches once
+    ``has_more`` is false.
+    A ``since`` ahead of the data (e.g. after a restore from backup), or from
+    before deletes whose tombstones were pruned, returns everything with
+    ``reset`` set, so the client starts over.
+    """
+    with db_connection() as conn:
+        # One read snapshot for the version, the rows and the tombstones
+        conn.execute('BEGIN')
+        current, pruned = conn.execute('SELECT version, pruned_version FROM sync_state WHERE id = 1').fetchone()
+        reset = since > current or since < pruned
+        if reset:
+            since = 0
         
-        # Convert to list of dicts and parse JSON mistakes
-        recitations = []
-        for row in rows:
-            recitation = dict(row)
-            if recitation['manual_mistakes']:
-                recitation['manual_mistakes'] = json.loads(recitation['manual_mistakes'])
-            recitations.append(recitation)
+        rows = conn.execute('''
+            SELECT * FROM recitations WHERE row_version > ? ORDER BY row_version LIMIT ?
+        ''', (since, limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        version = rows[-1]['row_version'] if has_more else current
         
-        return recitations
-    finally:
-        conn.close()
+        deleted = [row[0] for row in conn.execute('''
+            SELECT recitation_id FROM recitation_tombstones
+            WHERE version > ? AND version <= ? ORDER BY version
+        ''', (since, version))]
+        changed = _attach_mistakes(conn, [dict(row) for row in rows])
+        conn.commit()
+    
+    return {
+        'since': since,
+        'version': version,
+        'head': current,
+        'has_more': has_more,
+        'reset': reset,
+        'changed': changed,
+        'deleted': deleted
+    }
+
+MISTAKE_HALF_LIFE_DAYS = 30  # a mistake's weight in recency scores halves every 30 days
+
+def get_mistake_frequencies(
+    first_page: int,
+    last_page: int,
+    half_life_days: float = MISTAKE_HALF_LIFE_DAYS
+) -> List[tuple]:
+    """Per-word mistake counts over a page range, aggregated in one grouped query.
+    
+    Returns (word_id, page_number, count, score, last_mistake) tuples ordered
+    by word_id, where score sums 0.5 ** (age_in_days / half_life_days) over
+    the word's mistakes, so recent mistakes count for more.
+    """
+    with db_connection() as conn:
+        return [tuple(row) for row in conn.execute('''
+            SELECT
+                m.word_id,
+                MIN(m.page_number),
+                COUNT(*),
+                SUM(pow(0.5, (julianday('now') - julianday(r.recitation_date)) / ?)),
+                MAX(r.recitation_date)
+            FROM recitation_mistakes m
+            JOIN recitations r ON r.id = m.recitation_id
+            WHERE m.page_number BETWEEN ? AND ?
+            GROUP BY m.word_id
+            ORDER BY m.word_id
+        ''', (half_life_days, first_page, last_page))]
+
+MISTAKES_BACKFILL_BATCH = 5000
+
+def backfill_recitation_mistakes(batch_size: int = MISTAKES_BACKFILL_BATCH) -> int:
+    """Fill recitation_mistakes from the manual_mistakes JSON of existing rows.
+    
+    Walks recitations in id ranges of ``batch_size``, one short transaction
+    each, so writers are not held off for the whole table. Idempotent: rows
+    already present are skipped, so an interrupted run can simply be rerun.
+    Returns the number of mistake rows added.
+    """
+    added = 0
+    with db_connection() as conn:
+        max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM recitations').fetchone()[0]
+        for start in range(0, max_id, batch_size):
+            cursor = conn.execute(f'''
+                INSERT OR IGNORE INTO recitation_mistakes (recitation_id, position, word_id, page_number)
+                {_mistakes_from_json('recitations')}
+                WHERE recitations.id > ? AND recitations.id <= ?
+                  AND json_valid(recitations.manual_mistakes)
+            ''', (start, start + batch_size))
+            added += cursor.rowcount
+            conn.commit()
+    return added
 
 def update_recitation(
     recitation_id: int,
@@ -193,10 +1064,9 @@ def update_recitation(
     if prev_rating and not validate_rating(prev_rating):
         raise ValueError(f"Invalid prev_rating: {prev_rating}")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
         # Build update query dynamically
         update_fields = []
         params = []
@@ -223,55 +1093,50 @@ def update_recitation(
         conn.commit()
         
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 def delete_recitation(recitation_id: int) -> bool:
     """Delete a recitation record."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
         cursor.execute('DELETE FROM recitations WHERE id = ?', (recitation_id,))
         conn.commit()
         return cursor.rowcount > 0
-    finally:
-        conn.close()
 
 def get_recitation_stats() -> Dict[str, Any]:
-    """Get statistics about recitations."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        # Total recitations
-        cursor.execute('SELECT COUNT(*) as total FROM recitations')
-        total = cursor.fetchone()['total']
+    """Get statistics about recitations from the trigger-maintained summary."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
         
-        # Rating distribution
+        # Rating distribution (five rows at most); the total is their sum
         cursor.execute('''
-            SELECT rating, COUNT(*) as count 
-            FROM recitations 
-            GROUP BY rating 
+            SELECT key AS rating, count 
+            FROM recitation_stats 
+            WHERE kind = 'rating' 
             ORDER BY count DESC
         ''')
         rating_distribution = {row['rating']: row['count'] for row in cursor.fetchall()}
+        total = sum(rating_distribution.values())
         
-        # Pages covered
-        cursor.execute('SELECT COUNT(DISTINCT page_number) as pages_covered FROM recitations')
-        pages_covered = cursor.fetchone()['pages_covered']
+        # Pages and surahs covered: one summary row per distinct value
+        cursor.execute("SELECT COUNT(*) FROM recitation_stats WHERE kind = 'page'")
+        pages_covered = cursor.fetchone()[0]
         
-        # Surahs covered
-        cursor.execute('SELECT COUNT(DISTINCT surah_name) as surahs_covered FROM recitations')
-        surahs_covered = cursor.fetchone()['surahs_covered']
+        cursor.execute("SELECT COUNT(*) FROM recitation_stats WHERE kind = 'surah'")
+        surahs_covered = cursor.fetchone()[0]
         
-        # Recent activity (last 7 days)
+        # Recent activity (last 7 days): whole days from the daily buckets, plus
+        # an indexed count for the part of the boundary day inside the window
         cursor.execute('''
-            SELECT COUNT(*) as recent_count 
-            FROM recitations 
-            WHERE recitation_date >= datetime('now', '-7 days')
+            SELECT
+                (SELECT COALESCE(SUM(count), 0) FROM recitation_stats
+                 WHERE kind = 'day' AND key > date('now', '-7 days'))
+                +
+                (SELECT COUNT(*) FROM recitations
+                 WHERE recitation_date >= datetime('now', '-7 days')
+                   AND recitation_date < date('now', '-6 days'))
         ''')
-        recent_activity = cursor.fetchone()['recent_count']
+        recent_activity = cursor.fetchone()[0]
         
         return {
             'total_recitations': total,
@@ -280,44 +1145,131 @@ def get_recitation_stats() -> Dict[str, Any]:
             'surahs_covered': surahs_covered,
             'recent_activity_7_days': recent_activity
         }
-    finally:
-        conn.close()
 
-def backup_database(backup_path: str) -> bool:
-    """Create a backup of the database."""
+def rebuild_recitation_stats() -> int:
+    """Recompute the statistics summary from the recitations table; returns bucket count."""
+    with db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM recitation_stats')
+        conn.execute(f'INSERT INTO recitation_stats (kind, key, count) {STATS_FROM_RECITATIONS_SQL}')
+        return conn.execute('SELECT COUNT(*) FROM recitation_stats').fetchone()[0]
+
+def verify_recitation_stats() -> List[Dict[str, Any]]:
+    """Compare the summary with the live table; returns the buckets that differ."""
+    with db_connection() as conn:
+        # One read transaction, so both sides see the same snapshot
+        conn.execute('BEGIN')
+        expected = {(row['kind'], row['key']): row['count'] for row in conn.execute(STATS_FROM_RECITATIONS_SQL)}
+        actual = {(row['kind'], row['key']): row['count'] for row in conn.execute('SELECT kind, key, count FROM recitation_stats')}
+        conn.rollback()
+    
+    return [
+        {'kind': kind, 'key': key, 'expected': expected.get((kind, key), 0), 'actual': actual.get((kind, key), 0)}
+        for kind, key in sorted(set(expected) | set(actual), key=lambda k: (k[0], str(k[1])))
+        if expected.get((kind, key), 0) != actual.get((kind, key), 0)
+    ]
+
+BACKUP_PAGES_PER_STEP = 1024  # 4 MB per step at the default page size
+BACKUP_STEP_SLEEP = 0.005      # seconds before retrying a step that got SQLITE_BUSY or SQLITE_LOCKED
+
+def backup_database(backup_path: str, progress=None) -> bool:
+    """Create a consistent online backup of the database.
+    
+    Uses SQLite's backup API in steps of BACKUP_PAGES_PER_STEP pages over a
+    single read snapshot, so writers keep committing while it runs. ``progress`` is called
+    as ``progress(remaining_pages, total_pages)`` after each step. The copy is
+    written next to ``backup_path`` and renamed into place when complete.
+    """
+    partial_path = backup_path + '.partial'
     try:
-        import shutil
-        shutil.copy2(DB_PATH, backup_path)
+        target = sqlite3.connect(partial_path)
+        try:
+            with db_connection() as conn:
+                # Pin a read snapshot for the whole copy: otherwise every commit
+                # from another connection restarts the backup from page one,
+                # and under steady writes it would never finish. In WAL mode
+                # the open read transaction does not block those writers.
+                conn.execute('BEGIN')
+                conn.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+                conn.backup(
+                    target,
+                    pages=BACKUP_PAGES_PER_STEP,
+                    progress=(lambda status, remaining, total: progress(remaining, total)) if progress else None,
+                    sleep=BACKUP_STEP_SLEEP
+                )
+        finally:
+            target.close()
+        os.replace(partial_path, backup_path)
         return True
     except Exception as e:
         print(f"Backup failed: {e}")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
         return False
 
-def export_recitations_to_csv(file_path: str) -> bool:
-    """Export all recitations to CSV format."""
+EXPORT_CHUNK_SIZE = 1000
+# Columns exported, in order; internal bookkeeping such as row_version is left out
+EXPORT_COLUMNS = [
+    'id', 'page_number', 'surah_name', 'juz', 'recitation_date', 'rating', 'manual_mistakes',
+    'notes', 'fixed_it_date', 'prev_rating', 'created_at', 'updated_at'
+]
+
+def iter_recitation_chunks(chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield the column names, then lists of raw rows, straight from one cursor.
+    
+    The whole walk runs in a single read transaction, so the export is a
+    consistent snapshot; memory holds one chunk at a time.
+    """
+    with db_connection() as conn:
+        cursor = conn.execute(
+            f"SELECT {', '.join(EXPORT_COLUMNS)} FROM recitations ORDER BY recitation_date DESC, id DESC"
+        )
+        yield [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+def stream_recitations_csv(chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield CSV text for all recitations, one chunk of rows at a time."""
     import csv
+    import io
     
-    try:
-        recitations = get_all_recitations()
-        
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            if not recitations:
-                return True  # Empty file is still a success
-            
-            fieldnames = recitations[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for recitation in recitations:
-                # Convert mistakes list to string for CSV
-                if recitation['manual_mistakes']:
-                    recitation['manual_mistakes'] = ','.join(map(str, recitation['manual_mistakes']))
-                writer.writerow(recitation)
-        
-        return True
-    except Exception as e:
-        print(f"CSV export failed: {e}")
-        return False
+    chunks = iter_recitation_chunks(chunk_size)
+    columns = next(chunks)
+    mistakes_index = columns.index('manual_mistakes')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            row = list(row)
+            # Stored as a JSON array of ints; "[1, 2]" -> "1,2" without parsing
+            if row[mistakes_index]:
+                row[mistakes_index] = row[mistakes_index][1:-1].replace(' ', '')
+            writer.writerow(row)
+        yield buffer.getvalue()
+
+def stream_recitations_ndjson(chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield newline-delimited JSON for all recitations, one chunk of rows at a time."""
+    chunks = iter_recitation_chunks(chunk_size)
+    columns = next(chunks)
+    mistakes_index = columns.index('manual_mistakes')
+    other_columns = [(i, column) for i, column in enumerate(columns) if i != mistakes_index]
+    
+    for rows in chunks:
+        lines = []
+        for row in rows:
+            # manual_mistakes is already JSON text, so splice it in rather than parse it
+            line = json.dumps({column: row[i] for i, column in other_columns})
+            lines.append(f'{line[:-1]}, "manual_mistakes": {row[mistakes_index] or "null"}}}\n')
+        yield ''.join(lines)
 
 # Initialize database when module is imported
 if __name__ == '__main__':
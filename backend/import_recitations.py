@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Bulk import of recitation history from CSV or Excel (.xlsx) files.
+
+Rows are read lazily, validated and inserted in large batches, each batch in
+one transaction (or, for loads as large as the existing table, the whole
+file in one transaction with indexes rebuilt at the end). Surah and juz are
+resolved from the page number, so only page_number and rating are required;
+manual_mistakes, notes and recitation_date are optional. Bad rows are reported with their row number
+and skipped; the rest of the file is still imported. If the file itself stops
+being readable (e.g. invalid UTF-8 halfway through), the import stops there,
+keeps what it already committed and says so in the report.
+
+Usage:
+    python import_recitations.py history.csv
+    python import_recitations.py history.xlsx --batch-size 10000
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import (
+    init_database, create_recitations_batch, bulk_recitation_load, count_recitations, validate_rating
+)
+from revision_scheduler import init_revision_schedule
+
+try:
+    import openpyxl
+except ImportError:  # Excel import is optional
+    openpyxl = None
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+BULK_LOAD_MIN_ROWS = 20000
+ESTIMATED_BYTES_PER_ROW = 40  # a typical CSV row; used to size up an upload before reading it
+READ_ERRORS = (ValueError, csv.Error, zipfile.BadZipFile)  # raised by the readers on an unreadable file
+
+# (surah_name, juz) for a page, or None if the page does not exist
+PageResolver = Callable[[int], Optional[Tuple[str, int]]]
+
+# --- Readers: yield (row_number, {column: value}) ---
+def read_csv_rows(binary_stream) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        yield reader.line_num, row
+
+def read_excel_rows(binary_stream) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    if openpyxl is None:
+        raise ValueError("Excel import requires the openpyxl package")
+    workbook = openpyxl.load_workbook(binary_stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip().lower() if name is not None else '' for name in header]
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            yield row_number, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+def read_rows(binary_stream, filename: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return read_excel_rows(binary_stream)
+    return read_csv_rows(binary_stream)
+
+# --- Field parsing ---
+def _parse_int(value: Any, field: str) -> int:
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field}: {value!r}")
+
+def parse_mistakes(value: Any) -> Optional[list]:
+    """Accept "1,2,3", "[1, 2, 3]", "1;2;3", a single number or an empty cell."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return [_parse_int(value, 'manual_mistakes')]
+    text = str(value).strip().strip('[]')
+    parts = [part for part in text.replace(';', ',').replace(' ', ',').split(',') if part]
+    try:
+        return [int(part) for part in parts] or None
+    except ValueError:
+        raise ValueError("manual_mistakes must be a list of integers")
+
+def parse_recitation_date(value: Any) -> Optional[str]:
+    """Normalize to the 'YYYY-MM-DD HH:MM:SS' UTC form SQLite's CURRENT_TIMESTAMP uses."""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Invalid recitation_date: {value!r}. Use ISO format.")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_row(row: Dict[str, Any], resolve_page: PageResolver) -> Dict[str, Any]:
+    """Turn one file row into a create_recitations_batch item, or raise ValueError."""
+    for field in ('page_number', 'rating'):
+        if row.get(field) in (None, ''):
+            raise ValueError(f"Missing required field: {field}")
+
+    page_number = _parse_int(row['page_number'], 'page_number')
+    resolved = resolve_page(page_number)
+    if resolved is None:
+        raise ValueError(f"Invalid page_number: {page_number}")
+
+    rating = str(row['rating']).strip()
+    if not validate_rating(rating):
+        raise ValueError(f"Invalid rating: {rating}. Must be one of: Perfect, Good, Okay, Bad, Rememorize")
+
+    notes = row.get('notes')
+    surah_name, juz = resolved
+    return {
+        'page_number': page_number,
+        'surah_name': surah_name,
+        'juz': juz,
+        'rating': rating,
+        'manual_mistakes': parse_mistakes(row.get('manual_mistakes')),
+        'notes': str(notes) if notes not in (None, '') else None,
+        'recitation_date': parse_recitation_date(row.get('recitation_date'))
+    }
+
+# --- Pipeline ---
+def _until_unreadable(rows: Iterable[Tuple[int, Dict[str, Any]]], report: Dict[str, Any]):
+    """Yield rows until the reader fails, then record why in ``report``."""
+    row_number = 0
+    try:
+        for row_number, row in rows:
+            yield row_number, row
+    except READ_ERRORS as e:
+        report['error'] = f"Could not read the file after row {row_number}: {e}"
+
+def use_bulk_load(size_bytes: Optional[int]) -> bool:
+    """Rebuild indexes after the load (rather than per row) when it is large
+    compared with the table already there.
+
+    Bulk mode holds the write lock for the whole file, reading and parsing
+    included, so it is for this offline CLI only; the upload endpoint always
+    commits batch by batch.
+    """
+    if not size_bytes:
+        return False
+    estimated_rows = size_bytes // ESTIMATED_BYTES_PER_ROW
+    return estimated_rows >= max(BULK_LOAD_MIN_ROWS, count_recitations())
+
+def import_rows(
+    rows: Iterable[Tuple[int, Dict[str, Any]]],
+    resolve_page: PageResolver,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    bulk: bool = False
+) -> Dict[str, Any]:
+    """Validate and insert rows batch by batch; memory holds one batch at a time.
+    
+    Each batch commits on its own, unless ``bulk`` is set, in which case the
+    whole file loads in one transaction through bulk_recitation_load. A file
+    that stops being readable ends the import with the rows read so far
+    inserted and the reason in ``report['error']``.
+    """
+    report = {'imported': 0, 'failed': 0, 'errors': [], 'errors_truncated': False, 'error': None}
+
+    def record_error(row_number, message):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': row_number, 'error': message})
+        else:
+            report['errors_truncated'] = True
+
+    def load(insert_batch):
+        batch = []
+        for row_number, row in _until_unreadable(rows, report):
+            try:
+                batch.append(parse_row(row, resolve_page))
+            except ValueError as e:
+                record_error(row_number, str(e))
+                continue
+            if len(batch) >= batch_size:
+                report['imported'] += insert_batch(batch)
+                batch = []
+        if batch:
+            report['imported'] += insert_batch(batch)
+
+    if bulk:
+        with bulk_recitation_load() as insert_batch:
+            load(insert_batch)
+    else:
+        load(lambda batch: len(create_recitations_batch(batch)))
+
+    return report
+
+def metadata_resolver(metadata) -> PageResolver:
+    """Page resolver backed by a MushafMetadata index."""
+    def resolve(page_number):
+        info = metadata.page_info(page_number)
+        return (info['surah_names'][0], info['juz']) if info else None
+    return resolve
+
+def load_page_resolver() -> PageResolver:
+    """Build the page index from the QUL databases (for use outside the app)."""
+    from qul_db import DEFAULT_QUL_DATABASES, open_readonly
+    from mushaf_index import MushafIndex
+    from quran_meta import MushafMetadata
+
+    layout = open_readonly(DEFAULT_QUL_DATABASES['layout'])
+    script = open_readonly(DEFAULT_QUL_DATABASES['script'])
+    try:
+        return metadata_resolver(MushafMetadata(MushafIndex(layout, script)))
+    finally:
+        layout.close()
+        script.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Import recitation history from CSV or Excel.')
+    parser.add_argument('file', help='CSV or .xlsx file to import')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='rows per transaction')
+    args = parser.parse_args()
+
+    init_database()
+    init_revision_schedule()
+    resolve_page = load_page_resolver()
+
+    started = datetime.now()
+    bulk = use_bulk_load(os.path.getsize(args.file))
+    with open(args.file, 'rb') as stream:
+        report = import_rows(read_rows(stream, args.file), resolve_page, args.batch_size, bulk)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    print(f"✅ Imported {report['imported']} recitations in {elapsed:.1f}s")
+    if report['error']:
+        print(f"❌ {report['error']}")
+    if report['failed']:
+        print(f"❌ {report['failed']} rows skipped:")
+        for error in report['errors']:
+            print(f"   row {error['row']}: {error['error']}")
+        if report['errors_truncated']:
+            print(f"   ... only the first {MAX_REPORTED_ERRORS} errors are shown")
+    return 0 if report['imported'] or not (report['failed'] or report['error']) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+In-process metrics, exposed in the Prometheus text format by /api/metrics.
+
+Counters and histograms are kept in REGISTRY; callback metrics (cache
+counters, for instance) are read when rendering. While a request runs,
+time spent in each phase (sql, encode, normalize, compress, search) is
+accumulated per thread, so a slow endpoint can be attributed to SQL, JSON
+encoding or the diacritic-normalization pass.
+
+SQLite connections opened through ``connect()`` are instrumented: execute()
+times per statement shape (operation and table), a trace callback counting
+every statement SQLite runs (trigger steps included), and an opt-in slow
+query log (SLOW_QUERY_SECONDS).
+
+Every series carries a pid label: under serve.py each worker keeps its own
+counters, so aggregate with sum() over pid. Workers call reset() right after
+the fork, so the master's warm-up traffic is not counted once per worker.
+"""
+
+import bisect
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Statements slower than this are printed with their SQL; None disables the log
+SLOW_QUERY_SECONDS: Optional[float] = None
+
+REGISTRY: List['Metric'] = []
+
+
+def _format_labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [(name, str(value)) for name, value in zip(names, values)]
+    pairs.append(('pid', str(os.getpid())))
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def samples(self) -> Iterable[Tuple[str, tuple, tuple, float]]:
+        """(suffix, extra label names, label values, value) for every series."""
+        return ()
+
+    def reset(self):
+        """Forget every recorded value (callback metrics have none of their own)."""
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, extra_names, values, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames + extra_names, values)} {value}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [('', (), labels, value) for labels, value in sorted(self._values.items())]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values: Dict[tuple, list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, list(series)) for labels, series in self._values.items())
+        samples = []
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                samples.append(('_bucket', ('le',), labels + (bound,), cumulative))
+            samples.append(('_sum', (), labels, round(series[-1], 6)))
+            samples.append(('_count', (), labels, cumulative))
+        return samples
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class CallbackMetric(Metric):
+    """Values read at render time: ``collect()`` yields (label values, value)."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Iterable[str],
+                 collect: Callable[[], Iterable[Tuple[tuple, float]]]):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        return [('', (), labels, value) for labels, value in self._collect()]
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Zero every counter and histogram, and the registered caches' counters."""
+    for metric in REGISTRY:
+        metric.reset()
+    for cache in _caches.values():
+        cache.reset_stats()
+
+
+# --- Request phases ---
+_local = threading.local()
+
+def begin_request():
+    _local.phases = {}
+
+def end_request() -> Dict[str, float]:
+    """Seconds spent in each phase since begin_request()."""
+    phases = getattr(_local, 'phases', None)
+    _local.phases = None
+    return phases or {}
+
+def add_phase_time(name: str, seconds: float):
+    phases = getattr(_local, 'phases', None)
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+@contextmanager
+def phase(name: str):
+    """Attribute the time inside the block to ``name`` for the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase_time(name, time.perf_counter() - started)
+
+
+# --- HTTP ---
+HTTP_REQUESTS = Counter('http_requests_total', 'Requests handled, by route, method and status.', ['endpoint', 'method', 'status'])
+HTTP_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time to build the response (for streamed bodies, until the first byte).',
+    ['endpoint', 'method']
+)
+HTTP_PHASE = Histogram('http_request_phase_seconds', 'Time per request spent in sql, encode, normalize, compress or search.', ['endpoint', 'phase'])
+HTTP_RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Response body size as sent (streamed bodies excluded).', ['endpoint'], SIZE_BUCKETS)
+
+
+# --- SQLite ---
+SQL_CONNECTIONS = Counter('sqlite_connections_opened_total', 'SQLite connections opened.', ['db'])
+SQL_STATEMENTS = Counter('sqlite_statements_total', 'Statements SQLite ran, from the trace callback; trigger steps count under the statement that fired them.', ['db', 'operation'])
+SQL_DURATION = Histogram('sqlite_statement_duration_seconds', 'Time in execute(): prepare plus the first step.', ['db', 'operation', 'table'])
+
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|ON)\s+(?:\w+\.)?(\w+)', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def statement_shape(sql: str) -> Tuple[str, str]:
+    """(operation, first table) of a statement, e.g. ('SELECT', 'recitations')."""
+    words = sql.split(None, 1)
+    table = _TABLE.search(sql)
+    return (words[0].upper() if words else 'OTHER'), (table.group(1) if table else '')
+
+def _observe_statement(db: str, sql: str, seconds: float):
+    operation, table = statement_shape(sql)
+    SQL_DURATION.observe(seconds, db, operation, table)
+    add_phase_time('sql', seconds)
+    if SLOW_QUERY_SECONDS is not None and seconds >= SLOW_QUERY_SECONDS:
+        print(f"Slow query on {db} ({seconds * 1000:.1f}ms): {' '.join(sql.split())[:1000]}")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe_statement(self.connection.db_label, sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _observe_statement(self.connection.db_label, sql, time.perf_counter() - started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    db_label = 'sqlite'
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(label: str, *args, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect() returning an instrumented connection reported as ``db=label``."""
+    conn = sqlite3.connect(*args, factory=InstrumentedConnection, **kwargs)
+    conn.db_label = label
+    SQL_CONNECTIONS.inc(label)
+
+    def trace(sql):
+        words = sql.split(None, 1)
+        if not words:
+            operation = 'OTHER'
+        elif words[0].startswith('--'):
+            operation = 'NESTED'  # run by SQLite itself, e.g. while altering a table
+        else:
+            operation = words[0].upper()
+        SQL_STATEMENTS.inc(label, operation)
+    conn.set_trace_callback(trace)
+    return conn
+
+
+# --- Caches ---
+_caches: Dict[str, object] = {}
+
+def _cache_samples(read: Callable[[str, dict], Iterable[Tuple[tuple, float]]]):
+    return lambda: [sample for name, cache in sorted(_caches.items()) for sample in read(name, cache.stats())]
+
+CallbackMetric('cache_requests_total', 'Cache lookups by result.', 'counter', ['cache', 'result'], _cache_samples(
+    lambda name, stats: [((name, 'hit'), stats['hits']), ((name, 'miss'), stats['misses'])]
+))
+CallbackMetric('cache_evictions_total', 'Entries dropped for space (lru) or age (expired).', 'counter', ['cache', 'reason'], _cache_samples(
+    lambda name, stats: [((name, 'lru'), stats['evictions']), ((name, 'expired'), stats['expirations'])]
+))
+CallbackMetric('cache_entries', 'Entries currently cached.', 'gauge', ['cache'], _cache_samples(
+    lambda name, stats: [((name,), stats['entries'])]
+))
+
+def register_cache(name: str, cache):
+    """Export an LRUCache's hit, miss, eviction and size counters as ``cache=name``."""
+    _caches[name] = cache
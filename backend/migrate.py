@@ -6,12 +6,12 @@ This script initializes the database schema and can be used for future migration
 
 import os
 import sys
-from datetime import datetime
 
 # Add the backend directory to the Python path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from database import init_database, get_db_connection, backup_database
+from database import init_database, get_db_connection, backfill_recitation_mistakes
+from backups import create_backup
 
 def run_migration():
     """Run the database migration."""
@@ -22,16 +22,11 @@ def run_migration():
     db_exists = os.path.exists(db_path)
     
     if db_exists:
-        # Create backup before migration
-        backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = os.path.join(backup_dir, f'hifz_tracker_backup_{timestamp}.db')
-        
-        print(f"Creating backup at: {backup_path}")
-        if backup_database(backup_path):
-            print("Backup created successfully!")
+        # Create backup before migration (online backup, rotated with the others)
+        print("Creating backup...")
+        backup_path = create_backup()
+        if backup_path:
+            print(f"Backup created successfully at: {backup_path}")
         else:
             print("Warning: Backup failed, but continuing with migration...")
     
@@ -39,6 +34,12 @@ def run_migration():
     print("Initializing database schema...")
     init_database()
     
+    # Word-level mistakes for recitations recorded before recitation_mistakes
+    # existed; idempotent, so an interrupted backfill is finished here
+    print("Backfilling word-level mistakes...")
+    added = backfill_recitation_mistakes()
+    print(f"✅ Backfilled {added} mistake rows")
+    
     # Verify the migration
     try:
         conn = get_db_connection()
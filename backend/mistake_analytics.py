@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional, Any, Iterable
+
+from quran_meta import juz_for_ayah
+
+
+def build_mistake_heatmap(
+    mushaf,
+    frequencies: Iterable[tuple],
+    surah: Optional[int] = None,
+    juz: Optional[int] = None
+) -> Dict[str, Any]:
+    """Attach QUL word positions to per-word mistake frequencies and roll them up per ayah.
+
+    ``frequencies`` are the grouped rows from ``get_mistake_frequencies``
+    (word_id, page_number, count, score, last_mistake). Counting happens in
+    SQL; this is a single pass over at most one row per word. Boundary pages
+    are shared between surahs and juz, so words outside ``surah`` / ``juz``
+    are dropped.
+    """
+    words: List[Dict[str, Any]] = []
+    ayahs: Dict[tuple, Dict[str, Any]] = {}
+    total = 0
+    max_score = 0.0
+
+    for word_id, page_number, count, score, last_mistake in frequencies:
+        word = mushaf.get_word(word_id)
+        if word is None:
+            continue
+        if surah is not None and word['surah'] != surah:
+            continue
+        if juz is not None and juz_for_ayah(word['surah'], word['ayah']) != juz:
+            continue
+
+        score = round(score, 4)
+        words.append({
+            'word_id': word_id,
+            'location': word['location'],
+            'surah': word['surah'],
+            'ayah': word['ayah'],
+            'word': word['word'],
+            'page_number': page_number,
+            'count': count,
+            'score': score,
+            'last_mistake': last_mistake
+        })
+        total += count
+        max_score = max(max_score, score)
+
+        ayah = ayahs.get((word['surah'], word['ayah']))
+        if ayah is None:
+            ayah = ayahs[(word['surah'], word['ayah'])] = {
+                'surah': word['surah'],
+                'ayah': word['ayah'],
+                'count': 0,
+                'score': 0.0,
+                'words': 0,
+                'last_mistake': last_mistake
+            }
+        ayah['count'] += count
+        ayah['score'] = round(ayah['score'] + score, 4)
+        ayah['words'] += 1
+        ayah['last_mistake'] = max(ayah['last_mistake'], last_mistake)
+
+    return {
+        'words': words,
+        'ayahs': [ayahs[key] for key in sorted(ayahs)],
+        'total_mistakes': total,
+        'max_score': max_score
+    }
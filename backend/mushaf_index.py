@@ -0,0 +1,120 @@
+import sqlite3
+from array import array
+from typing import List, Dict, Optional, Any, Iterable
+
+# Column order of the QUL `pages` table, kept so rows come back in the same shape
+PAGE_COLUMNS = ('page_number', 'line_number', 'line_type', 'is_centered',
+                'first_word_id', 'last_word_id', 'surah_number')
+
+
+class MushafIndex:
+    """Read-only, in-memory copy of the QUL layout and script databases.
+
+    Words are stored column-wise in flat arrays addressed by ``id - 1`` (word ids in
+    ``indopak.db`` are a dense 1..N range), and page lines are grouped per page, so
+    serving a page is a handful of list lookups instead of two SQL queries.
+    """
+
+    def __init__(self, layout_db: sqlite3.Connection, script_db: sqlite3.Connection):
+        self._surah = array('H')
+        self._ayah = array('H')
+        self._word = array('H')
+        self._text: List[str] = []
+        self._normalized: Optional[List[str]] = None  # precomputed in a compiled bundle
+        self._lines: Dict[int, tuple] = {}
+        self._load_words(script_db)
+        self._load_pages(layout_db)
+
+    # --- Loading ---
+    def _load_words(self, conn: sqlite3.Connection):
+        count = conn.execute('SELECT MAX(id) FROM words').fetchone()[0] or 0
+        self._surah = array('H', bytes(2 * count))
+        self._ayah = array('H', bytes(2 * count))
+        self._word = array('H', bytes(2 * count))
+        self._text = [None] * count
+        cur = conn.execute('SELECT id, surah, ayah, word, text FROM words')
+        for word_id, surah, ayah, word, text in cur:
+            i = word_id - 1
+            self._surah[i] = surah
+            self._ayah[i] = ayah
+            self._word[i] = word
+            self._text[i] = text
+
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(words)')}
+        if 'text_normalized' in columns:
+            self._normalized = [None] * count
+            for word_id, normalized in conn.execute('SELECT id, text_normalized FROM words'):
+                self._normalized[word_id - 1] = normalized
+
+    def _load_pages(self, conn: sqlite3.Connection):
+        cur = conn.execute(
+            f'SELECT {", ".join(PAGE_COLUMNS)} FROM pages ORDER BY page_number, line_number'
+        )
+        lines: Dict[int, list] = {}
+        for row in cur:
+            lines.setdefault(row[0], []).append(tuple(row))
+        self._lines = {page: tuple(page_lines) for page, page_lines in lines.items()}
+
+    @staticmethod
+    def _page_word_ids(page_lines: Iterable[tuple]) -> List[int]:
+        word_ids = []
+        for line in page_lines:
+            if line[2] == 'ayah':
+                word_ids.extend(range(line[4], line[5] + 1))
+        return word_ids
+
+    # --- Lookups ---
+    @property
+    def page_count(self) -> int:
+        return len(self._lines)
+
+    @property
+    def word_count(self) -> int:
+        return len(self._text)
+
+    def has_word(self, word_id: int) -> bool:
+        return 0 < word_id <= len(self._text) and self._text[word_id - 1] is not None
+
+    def get_word(self, word_id: int) -> Optional[Dict[str, Any]]:
+        """Return a word in the same shape as a row of the QUL `words` table."""
+        if not self.has_word(word_id):
+            return None
+        i = word_id - 1
+        surah, ayah, word = self._surah[i], self._ayah[i], self._word[i]
+        return {
+            'id': word_id,
+            'location': f'{surah}:{ayah}:{word}',
+            'surah': surah,
+            'ayah': ayah,
+            'word': word,
+            'text': self._text[i]
+        }
+
+    def normalized_text(self, word_id: int) -> Optional[str]:
+        """Diacritic-free text, if precomputed (compiled bundle); otherwise None."""
+        if self._normalized is None or not self.has_word(word_id):
+            return None
+        return self._normalized[word_id - 1]
+
+    def get_words(self, word_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        if word_ids is None:
+            word_ids = range(1, len(self._text) + 1)
+        return [w for w in (self.get_word(word_id) for word_id in word_ids) if w is not None]
+
+    def get_lines(self, page_number: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return page lines in the same shape as rows of the QUL `pages` table."""
+        if page_number is not None:
+            rows = self._lines.get(page_number, ())
+        else:
+            rows = (line for page_lines in self._lines.values() for line in page_lines)
+        return [dict(zip(PAGE_COLUMNS, row)) for row in rows]
+
+    def page_word_ids(self, page_number: int) -> List[int]:
+        return self._page_word_ids(self._lines.get(page_number, ()))
+
+    def page_numbers(self) -> List[int]:
+        return sorted(self._lines)
+
+    def word_position(self, word_id: int) -> tuple:
+        """(surah, ayah) of a word, without building a dict."""
+        return self._surah[word_id - 1], self._ayah[word_id - 1]
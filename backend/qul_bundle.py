@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Compile the QUL layout and script databases into one derived bundle.
+
+The raw QUL files are shaped for distribution, not serving: `words` has no
+key, page lines use '' for missing word ids, and per-page juz/surah data has
+to be derived. The bundle stores the same data ready to load:
+
+    words        id INTEGER PRIMARY KEY, ..., text_normalized (diacritics removed)
+    pages        integer-clean lines (NULL, not '', for missing values)
+    page_words   page -> first/last word id and word count
+    page_meta    page -> juz and surah numbers, first/last ayah
+    bundle_info  version, content hash, source file hashes
+
+The content hash covers every row, so it changes exactly when the served
+data does and can be used for cache-busting. The app loads the bundle at
+startup when present (see qul_db.DEFAULT_QUL_BUNDLE).
+
+Usage:
+    python qul_bundle.py                  # default QUL paths -> qul_downloads/qul_bundle.db
+    python qul_bundle.py --output PATH
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from qul_db import DEFAULT_QUL_DATABASES, DEFAULT_QUL_BUNDLE, open_readonly
+from mushaf_index import MushafIndex
+from quran_meta import MushafMetadata
+from search_index import remove_diacritics
+
+BUNDLE_VERSION = 1
+
+
+def _clean_int(value: Any) -> Optional[int]:
+    return None if value in ('', None) else int(value)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compile_bundle(layout_path: str, script_path: str, bundle_path: str) -> Dict[str, Any]:
+    """Build the bundle at ``bundle_path``; returns its bundle_info."""
+    layout = open_readonly(layout_path)
+    script = open_readonly(script_path)
+    try:
+        mushaf = MushafIndex(layout, script)
+    finally:
+        layout.close()
+        script.close()
+    metadata = MushafMetadata(mushaf)
+
+    partial_path = bundle_path + '.partial'
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    conn = sqlite3.connect(partial_path)
+    content = hashlib.sha256()
+
+    def insert(table, rows):
+        rows = list(rows)
+        for row in rows:
+            content.update(json.dumps([table, *row], ensure_ascii=False).encode('utf-8'))
+        conn.executemany(f'INSERT INTO {table} VALUES ({", ".join("?" * len(rows[0]))})', rows)
+
+    try:
+        conn.executescript('''
+            PRAGMA page_size = 4096;
+            PRAGMA journal_mode = OFF;
+            CREATE TABLE words (
+                id INTEGER PRIMARY KEY,
+                location TEXT NOT NULL,
+                surah INTEGER NOT NULL,
+                ayah INTEGER NOT NULL,
+                word INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                text_normalized TEXT NOT NULL
+            );
+            CREATE TABLE pages (
+                page_number INTEGER NOT NULL,
+                line_number INTEGER NOT NULL,
+                line_type TEXT NOT NULL,
+                is_centered INTEGER NOT NULL,
+                first_word_id INTEGER,
+                last_word_id INTEGER,
+                surah_number INTEGER,
+                PRIMARY KEY (page_number, line_number)
+            ) WITHOUT ROWID;
+            CREATE TABLE page_words (
+                page_number INTEGER PRIMARY KEY,
+                first_word_id INTEGER NOT NULL,
+                last_word_id INTEGER NOT NULL,
+                word_count INTEGER NOT NULL
+            );
+            CREATE TABLE page_meta (
+                page_number INTEGER PRIMARY KEY,
+                juz INTEGER NOT NULL,
+                juz_numbers TEXT NOT NULL,   -- JSON array
+                surah_numbers TEXT NOT NULL, -- JSON array
+                first_ayah TEXT NOT NULL,
+                last_ayah TEXT NOT NULL
+            );
+            CREATE TABLE bundle_info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        ''')
+
+        insert('words', (
+            (w['id'], w['location'], w['surah'], w['ayah'], w['word'], w['text'], remove_diacritics(w['text']))
+            for w in mushaf.get_words()
+        ))
+        insert('pages', (
+            (
+                line['page_number'], line['line_number'], line['line_type'], _clean_int(line['is_centered']),
+                _clean_int(line['first_word_id']), _clean_int(line['last_word_id']), _clean_int(line['surah_number'])
+            )
+            for line in mushaf.get_lines()
+        ))
+        pages = [metadata.page_info(page_number) for page_number in mushaf.page_numbers()]
+        pages = [info for info in pages if info]
+        insert('page_words', (
+            (info['page_number'], info['first_word_id'], info['last_word_id'],
+             len(mushaf.page_word_ids(info['page_number'])))
+            for info in pages
+        ))
+        insert('page_meta', (
+            (info['page_number'], info['juz'], json.dumps(info['juz_numbers']),
+             json.dumps(info['surah_numbers']), info['first_ayah'], info['last_ayah'])
+            for info in pages
+        ))
+
+        info = {
+            'version': str(BUNDLE_VERSION),
+            'content_hash': content.hexdigest(),
+            'built_at': datetime.now().isoformat(),
+            'layout_sha256': _file_sha256(layout_path),
+            'script_sha256': _file_sha256(script_path)
+        }
+        conn.executemany('INSERT INTO bundle_info VALUES (?, ?)', info.items())
+        conn.commit()
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+    os.replace(partial_path, bundle_path)
+    return info
+
+
+def load_bundle(conn: sqlite3.Connection, sources: Optional[Dict[str, str]] = None):
+    """(MushafIndex, MushafMetadata, bundle_info) from an open bundle.
+
+    ``sources`` maps 'layout' and 'script' to the QUL databases the bundle
+    should have been built from; those present are hashed and compared with
+    the hashes recorded at build time. Raises ValueError if the bundle was
+    built by another version of this script or from different source files.
+    """
+    info = {row[0]: row[1] for row in conn.execute('SELECT key, value FROM bundle_info')}
+    if info.get('version') != str(BUNDLE_VERSION):
+        raise ValueError(f"QUL bundle version {info.get('version')} does not match {BUNDLE_VERSION}; rebuild it")
+    for name, path in (sources or {}).items():
+        if os.path.exists(path) and info.get(f'{name}_sha256') != _file_sha256(path):
+            raise ValueError(f"QUL bundle was built from a different {name} database ({path}); rebuild it")
+
+    mushaf = MushafIndex(conn, conn)
+    rows = conn.execute('''
+        SELECT m.page_number, m.juz_numbers, m.surah_numbers, m.first_ayah, m.last_ayah,
+               w.first_word_id, w.last_word_id
+        FROM page_meta m JOIN page_words w USING (page_number)
+        ORDER BY m.page_number
+    ''')
+    metadata = MushafMetadata.from_pages(
+        {
+            'page_number': row[0],
+            'juz_numbers': json.loads(row[1]),
+            'surah_numbers': json.loads(row[2]),
+            'first_ayah': row[3],
+            'last_ayah': row[4],
+            'first_word_id': row[5],
+            'last_word_id': row[6]
+        }
+        for row in rows
+    )
+    return mushaf, metadata, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the QUL databases into one derived bundle.')
+    parser.add_argument('--layout', default=DEFAULT_QUL_DATABASES['layout'], help='QUL page layout database')
+    parser.add_argument('--script', default=DEFAULT_QUL_DATABASES['script'], help='QUL script (words) database')
+    parser.add_argument('--output', default=DEFAULT_QUL_BUNDLE, help='bundle to write')
+    args = parser.parse_args()
+
+    started = datetime.now()
+    info = compile_bundle(args.layout, args.script, args.output)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    print(f"✅ Compiled {args.output} in {elapsed:.1f}s")
+    print(f"✅ Content hash {info['content_hash']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
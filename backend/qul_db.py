@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+from typing import Dict
+
+import metrics
+
+QUL_MMAP_SIZE = 268435456  # 256 MB; both QUL files fit entirely
+
+# Paths to QUL databases (update if needed)
+QUL_DIR = os.path.join(os.path.dirname(__file__), '../qul_downloads')
+DEFAULT_QUL_DATABASES = {
+    'layout': os.path.join(QUL_DIR, 'qudratullah-indopak-15-lines.db'),
+    'script': os.path.join(QUL_DIR, 'indopak.db')
+}
+
+# Compiled from the two files above by qul_bundle.py; preferred when present
+DEFAULT_QUL_BUNDLE = os.path.join(QUL_DIR, 'qul_bundle.db')
+
+
+def open_readonly(db_path: str) -> sqlite3.Connection:
+    """Open a QUL file read-only and immutable, so SQLite skips locking and change checks."""
+    uri = f'file:{quote(os.path.abspath(db_path))}?mode=ro&immutable=1'
+    label = 'qul:' + os.path.splitext(os.path.basename(db_path))[0]
+    conn = metrics.connect(label, uri, uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA mmap_size = {QUL_MMAP_SIZE}')
+    return conn
+
+
+class QulDatabases:
+    """Process-wide read-only handles to the configured QUL databases.
+
+    The QUL files never change, so each is opened once and shared by every
+    request thread. With a serialized SQLite build (``sqlite3.threadsafety == 3``)
+    one connection is shared outright; otherwise each thread gets its own.
+    """
+
+    def __init__(self, databases: Dict[str, str]):
+        self.databases = dict(databases)
+        self._shared = sqlite3.threadsafety == 3
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> sqlite3.Connection:
+        if name not in self.databases:
+            raise KeyError(f"Unknown QUL database: {name}")
+        if self._shared:
+            conn = self._connections.get(name)
+            if conn is None:
+                with self._lock:
+                    conn = self._connections.get(name)
+                    if conn is None:
+                        conn = self._connections[name] = open_readonly(self.databases[name])
+            return conn
+
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        if name not in connections:
+            connections[name] = open_readonly(self.databases[name])
+        return connections[name]
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
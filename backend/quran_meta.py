@@ -0,0 +1,159 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Any
+
+# Transliterated surah names, indexed by surah number - 1
+SURAH_NAMES = [
+    'Al-Fatiha', 'Al-Baqarah', 'Ali Imran', 'An-Nisa', 'Al-Maidah', 'Al-Anam',
+    'Al-Araf', 'Al-Anfal', 'At-Tawbah', 'Yunus', 'Hud', 'Yusuf', 'Ar-Rad',
+    'Ibrahim', 'Al-Hijr', 'An-Nahl', 'Al-Isra', 'Al-Kahf', 'Maryam', 'Ta-Ha',
+    'Al-Anbiya', 'Al-Hajj', 'Al-Muminun', 'An-Nur', 'Al-Furqan', 'Ash-Shuara',
+    'An-Naml', 'Al-Qasas', 'Al-Ankabut', 'Ar-Rum', 'Luqman', 'As-Sajdah',
+    'Al-Ahzab', 'Saba', 'Fatir', 'Ya-Sin', 'As-Saffat', 'Sad', 'Az-Zumar',
+    'Ghafir', 'Fussilat', 'Ash-Shura', 'Az-Zukhruf', 'Ad-Dukhan', 'Al-Jathiyah',
+    'Al-Ahqaf', 'Muhammad', 'Al-Fath', 'Al-Hujurat', 'Qaf', 'Adh-Dhariyat',
+    'At-Tur', 'An-Najm', 'Al-Qamar', 'Ar-Rahman', 'Al-Waqiah', 'Al-Hadid',
+    'Al-Mujadilah', 'Al-Hashr', 'Al-Mumtahanah', 'As-Saff', 'Al-Jumuah',
+    'Al-Munafiqun', 'At-Taghabun', 'At-Talaq', 'At-Tahrim', 'Al-Mulk',
+    'Al-Qalam', 'Al-Haqqah', 'Al-Maarij', 'Nuh', 'Al-Jinn', 'Al-Muzzammil',
+    'Al-Muddaththir', 'Al-Qiyamah', 'Al-Insan', 'Al-Mursalat', 'An-Naba',
+    'An-Naziat', 'Abasa', 'At-Takwir', 'Al-Infitar', 'Al-Mutaffifin',
+    'Al-Inshiqaq', 'Al-Buruj', 'At-Tariq', 'Al-Ala', 'Al-Ghashiyah', 'Al-Fajr',
+    'Al-Balad', 'Ash-Shams', 'Al-Layl', 'Ad-Duha', 'Ash-Sharh', 'At-Tin',
+    'Al-Alaq', 'Al-Qadr', 'Al-Bayyinah', 'Az-Zalzalah', 'Al-Adiyat',
+    'Al-Qariah', 'At-Takathur', 'Al-Asr', 'Al-Humazah', 'Al-Fil', 'Quraysh',
+    'Al-Maun', 'Al-Kawthar', 'Al-Kafirun', 'An-Nasr', 'Al-Masad', 'Al-Ikhlas',
+    'Al-Falaq', 'An-Nas'
+]
+
+# (surah, ayah) at which each juz begins, indexed by juz number - 1.
+# Juz boundaries are fixed by ayah, so they hold for any Mushaf layout.
+JUZ_STARTS = [
+    (1, 1), (2, 142), (2, 253), (3, 93), (4, 24), (4, 148), (5, 82), (6, 111),
+    (7, 88), (8, 41), (9, 93), (11, 6), (12, 53), (15, 1), (17, 1), (18, 75),
+    (21, 1), (23, 1), (25, 21), (27, 56), (29, 46), (33, 31), (36, 28), (39, 32),
+    (41, 47), (46, 1), (51, 31), (58, 1), (67, 1), (78, 1)
+]
+
+
+def juz_for_ayah(surah: int, ayah: int) -> int:
+    return bisect_right(JUZ_STARTS, (surah, ayah))
+
+
+def surah_name(surah_number: int) -> Optional[str]:
+    if 1 <= surah_number <= len(SURAH_NAMES):
+        return SURAH_NAMES[surah_number - 1]
+    return None
+
+
+class MushafMetadata:
+    """Page -> juz/surah/ayah metadata, with juz and surah -> page range maps.
+
+    Built once from a MushafIndex; every lookup afterwards is a dict or list
+    access.
+    """
+
+    def __init__(self, mushaf=None):
+        self._pages: Dict[int, Dict[str, Any]] = {}
+        self._juz_ranges: Dict[int, tuple] = {}
+        self._surah_ranges: Dict[int, tuple] = {}
+        if mushaf is not None:
+            self._build(mushaf)
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Dict[str, Any]]) -> 'MushafMetadata':
+        """Rebuild from precomputed page rows (page_number, juz_numbers,
+        surah_numbers, first/last ayah and word id), e.g. a compiled bundle."""
+        metadata = cls()
+        for page in pages:
+            metadata._add_page({
+                'page_number': page['page_number'],
+                'juz': page['juz_numbers'][0],
+                'juz_numbers': list(page['juz_numbers']),
+                'surah_numbers': list(page['surah_numbers']),
+                'surah_names': [surah_name(s) for s in page['surah_numbers']],
+                'first_ayah': page['first_ayah'],
+                'last_ayah': page['last_ayah'],
+                'first_word_id': page['first_word_id'],
+                'last_word_id': page['last_word_id']
+            })
+        return metadata
+
+    def _add_page(self, info: Dict[str, Any]):
+        self._pages[info['page_number']] = info
+        for juz in info['juz_numbers']:
+            self._extend_range(self._juz_ranges, juz, info['page_number'])
+        for surah in info['surah_numbers']:
+            self._extend_range(self._surah_ranges, surah, info['page_number'])
+
+    def _build(self, mushaf):
+        for page_number in mushaf.page_numbers():
+            word_ids = mushaf.page_word_ids(page_number)
+            if not word_ids:
+                continue
+            surahs: List[int] = []
+            juz_numbers: List[int] = []
+            last_ayah = None
+            for word_id in word_ids:
+                position = mushaf.word_position(word_id)
+                if position == last_ayah:
+                    continue
+                last_ayah = position
+                if not surahs or surahs[-1] != position[0]:
+                    surahs.append(position[0])
+                juz = juz_for_ayah(*position)
+                if not juz_numbers or juz_numbers[-1] != juz:
+                    juz_numbers.append(juz)
+
+            first = mushaf.word_position(word_ids[0])
+            last = mushaf.word_position(word_ids[-1])
+            self._add_page({
+                'page_number': page_number,
+                'juz': juz_numbers[0],
+                'juz_numbers': juz_numbers,
+                'surah_numbers': surahs,
+                'surah_names': [surah_name(s) for s in surahs],
+                'first_ayah': f'{first[0]}:{first[1]}',
+                'last_ayah': f'{last[0]}:{last[1]}',
+                'first_word_id': word_ids[0],
+                'last_word_id': word_ids[-1]
+            })
+
+    @staticmethod
+    def _extend_range(ranges: Dict[int, tuple], key: int, page_number: int):
+        first, _ = ranges.get(key, (page_number, page_number))
+        ranges[key] = (first, page_number)
+
+    # --- Lookups ---
+    def page_info(self, page_number: int) -> Optional[Dict[str, Any]]:
+        return self._pages.get(page_number)
+
+    def page_surah_name(self, page_number: int) -> Optional[str]:
+        """Name of the surah the page opens with, as stored on recitations."""
+        info = self._pages.get(page_number)
+        return info['surah_names'][0] if info else None
+
+    def page_juz(self, page_number: int) -> Optional[int]:
+        info = self._pages.get(page_number)
+        return info['juz'] if info else None
+
+    def juz_pages(self, juz_number: int) -> range:
+        first, last = self._juz_ranges.get(juz_number, (1, 0))
+        return range(first, last + 1)
+
+    def surah_pages(self, surah_number: int) -> range:
+        first, last = self._surah_ranges.get(surah_number, (1, 0))
+        return range(first, last + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Full index in a JSON-friendly shape for the metadata endpoint."""
+        return {
+            'pages': [self._pages[p] for p in sorted(self._pages)],
+            'juz': {
+                juz: {'first_page': first, 'last_page': last}
+                for juz, (first, last) in sorted(self._juz_ranges.items())
+            },
+            'surahs': {
+                surah: {'name': surah_name(surah), 'first_page': first, 'last_page': last}
+                for surah, (first, last) in sorted(self._surah_ranges.items())
+            }
+        }
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Rebuild or verify the recitation statistics summary.
+
+The recitation_stats table is kept current by triggers. This script
+recomputes it from the recitations table, or (with --verify) only checks
+that it matches.
+
+Usage:
+    python rebuild_stats.py           # rebuild, then verify
+    python rebuild_stats.py --verify  # verify only; exits 1 on mismatch
+"""
+
+import argparse
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import init_database, rebuild_recitation_stats, verify_recitation_stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild or verify the recitation statistics summary.')
+    parser.add_argument('--verify', action='store_true', help='only compare the summary with the live table')
+    args = parser.parse_args()
+
+    init_database()
+
+    if not args.verify:
+        buckets = rebuild_recitation_stats()
+        print(f"✅ Rebuilt statistics summary ({buckets} buckets)")
+
+    mismatches = verify_recitation_stats()
+    if mismatches:
+        print(f"❌ {len(mismatches)} summary buckets differ from the recitations table:")
+        for mismatch in mismatches:
+            print(f"   {mismatch['kind']}={mismatch['key']}: expected {mismatch['expected']}, found {mismatch['actual']}")
+        return 1
+
+    print("✅ Statistics summary matches the recitations table")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
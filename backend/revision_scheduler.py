@@ -0,0 +1,221 @@
+"""
+Spaced-repetition revision schedule, one memory state per page.
+
+Each page carries an SM-2 style state (repetitions, interval in days, ease,
+due date) in the page_schedule table. Triggers on recitations apply one
+review step per new session, so the state is always current and "what is
+due" is an indexed range read on due_date that never touches history.
+
+Sessions recorded out of order (a backdated import) or deleted cannot be
+applied as a single step; the triggers mark the page stale instead, and it
+is replayed from its history before the next due-queue read. A full replay
+of every page, needed when REVISION_PARAMS change, runs as one set-based
+query (rebuild_revision_schedule).
+"""
+
+import json
+from typing import Any, Dict, Iterable, Optional
+
+from database import db_connection, register_bulk_load_triggers
+
+# SM-2 parameters. Changing them is picked up by init_revision_schedule,
+# which then rebuilds the triggers and replays all history.
+REVISION_PARAMS = {
+    'quality': {'Perfect': 5, 'Good': 4, 'Okay': 3, 'Bad': 2, 'Rememorize': 0},
+    'pass_quality': 3,       # below this the page lapses and starts over
+    'initial_ease': 2.5,
+    'min_ease': 1.3,
+    'first_interval': 1,     # days after the first passing review
+    'second_interval': 6,    # days after the second
+    'lapse_interval': 1,     # days after a lapse
+}
+
+SCHEDULE_TRIGGERS = ['page_schedule_insert', 'page_schedule_delete', 'page_schedule_update']
+SCHEDULE_COLUMNS = ['repetitions', 'interval_days', 'ease', 'due_date', 'last_rating', 'last_reviewed']
+
+def _step_sql(state: Dict[str, str], rating: str, reviewed: str, params: Dict[str, Any] = REVISION_PARAMS) -> Dict[str, str]:
+    """SQL expressions for the state after one review.
+
+    ``state`` maps repetitions / interval_days / ease to the expressions
+    holding the previous state; ``rating`` and ``reviewed`` are the session's.
+    """
+    quality = params['quality']
+    ease_delta = ' '.join(
+        f"WHEN '{name}' THEN {0.1 - (5 - q) * (0.08 + (5 - q) * 0.02):.4f}" for name, q in quality.items()
+    )
+    lapses = ', '.join(f"'{name}'" for name, q in quality.items() if q < params['pass_quality'])
+    ease = f"max({params['min_ease']}, {state['ease']} + CASE {rating} {ease_delta} ELSE 0 END)"
+    interval = (
+        f"CASE WHEN {rating} IN ({lapses}) THEN {params['lapse_interval']} "
+        f"WHEN {state['repetitions']} = 0 THEN {params['first_interval']} "
+        f"WHEN {state['repetitions']} = 1 THEN {params['second_interval']} "
+        f"ELSE round({state['interval_days']} * {ease}, 2) END"
+    )
+    return {
+        'repetitions': f"CASE WHEN {rating} IN ({lapses}) THEN 0 ELSE {state['repetitions']} + 1 END",
+        'interval_days': interval,
+        'ease': ease,
+        'due_date': f"datetime(julianday({reviewed}) + {interval})",
+        'last_rating': rating,
+        'last_reviewed': reviewed
+    }
+
+def _create_schedule_triggers(cursor):
+    own_state = {column: column for column in ('repetitions', 'interval_days', 'ease')}
+    step = _step_sql(own_state, 'NEW.rating', 'NEW.recitation_date')
+    assignments = ', '.join(f'{column} = {step[column]}' for column in SCHEDULE_COLUMNS)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS page_schedule_insert
+        AFTER INSERT ON recitations
+        BEGIN
+            INSERT OR IGNORE INTO page_schedule (page_number, repetitions, interval_days, ease)
+            VALUES (NEW.page_number, 0, 0, {REVISION_PARAMS['initial_ease']});
+            UPDATE page_schedule SET stale = 1
+            WHERE page_number = NEW.page_number AND last_reviewed > NEW.recitation_date;
+            UPDATE page_schedule SET {assignments}
+            WHERE page_number = NEW.page_number
+              AND (last_reviewed IS NULL OR last_reviewed <= NEW.recitation_date);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS page_schedule_delete
+        AFTER DELETE ON recitations
+        BEGIN
+            UPDATE page_schedule SET stale = 1 WHERE page_number = OLD.page_number;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS page_schedule_update
+        AFTER UPDATE OF page_number, rating, recitation_date ON recitations
+        BEGIN
+            INSERT OR IGNORE INTO page_schedule (page_number, repetitions, interval_days, ease, stale)
+            VALUES (NEW.page_number, 0, 0, {REVISION_PARAMS['initial_ease']}, 1);
+            UPDATE page_schedule SET stale = 1 WHERE page_number IN (OLD.page_number, NEW.page_number);
+        END
+    ''')
+
+def _replay_sql() -> str:
+    """Recompute page states by stepping through each page's numbered revision_history."""
+    initial = {'repetitions': '0', 'interval_days': '0', 'ease': str(REVISION_PARAMS['initial_ease'])}
+    first = _step_sql(initial, 'h.rating', 'h.recitation_date')
+    following = _step_sql(
+        {column: f's.{column}' for column in ('repetitions', 'interval_days', 'ease')},
+        'h.rating', 'h.recitation_date'
+    )
+    columns = ', '.join(SCHEDULE_COLUMNS)
+    return f'''
+        WITH RECURSIVE replay(page_number, n, {columns}) AS (
+            SELECT h.page_number, h.n, {', '.join(first[column] for column in SCHEDULE_COLUMNS)}
+            FROM revision_history h WHERE h.n = 1
+            UNION ALL
+            SELECT h.page_number, h.n, {', '.join(following[column] for column in SCHEDULE_COLUMNS)}
+            FROM replay s JOIN revision_history h ON h.page_number = s.page_number AND h.n = s.n + 1
+        )
+        INSERT INTO page_schedule (page_number, {columns}, stale)
+        SELECT page_number, {columns}, 0
+        FROM (SELECT *, MAX(n) FROM replay GROUP BY page_number)
+    '''
+
+def _replay(conn, page_numbers: Optional[Iterable[int]] = None) -> int:
+    """Replay history into page_schedule inside the caller's transaction; returns pages replayed."""
+    if page_numbers is not None:
+        page_numbers = sorted(set(page_numbers))
+        if not page_numbers:
+            return 0
+        where = f'WHERE page_number IN ({", ".join("?" * len(page_numbers))})'
+        params = page_numbers
+    else:
+        where, params = '', []
+
+    # Numbered history per page, indexed so each replay step is one lookup
+    conn.execute('DROP TABLE IF EXISTS temp.revision_history')
+    conn.execute(f'''
+        CREATE TEMP TABLE revision_history AS
+        SELECT page_number, rating, recitation_date,
+               ROW_NUMBER() OVER (PARTITION BY page_number ORDER BY recitation_date, id) AS n
+        FROM recitations {where}
+    ''', params)
+    conn.execute('CREATE INDEX temp.revision_history_page_n ON revision_history(page_number, n)')
+
+    conn.execute(f'DELETE FROM page_schedule {where}', params)
+    conn.execute(_replay_sql())
+    conn.execute('DROP TABLE temp.revision_history')
+    return conn.execute(f'SELECT COUNT(*) FROM page_schedule {where}', params).fetchone()[0]
+
+def init_revision_schedule():
+    """Create the schedule table and triggers; replay everything if it is new or REVISION_PARAMS changed."""
+    params = json.dumps(REVISION_PARAMS, sort_keys=True)
+    with db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS page_schedule (
+                page_number INTEGER PRIMARY KEY,
+                repetitions INTEGER NOT NULL,
+                interval_days REAL NOT NULL,
+                ease REAL NOT NULL,
+                due_date DATETIME,
+                last_rating TEXT,
+                last_reviewed DATETIME,
+                stale INTEGER NOT NULL DEFAULT 0 -- needs a replay from history
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_page_schedule_due ON page_schedule(due_date)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_page_schedule_stale ON page_schedule(page_number) WHERE stale = 1')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS revision_schedule_params (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                params TEXT NOT NULL
+            )
+        ''')
+
+        row = conn.execute('SELECT params FROM revision_schedule_params WHERE id = 1').fetchone()
+        if row is None or row['params'] != params:
+            for trigger_name in SCHEDULE_TRIGGERS:
+                conn.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+            _create_schedule_triggers(conn)
+            _replay(conn)
+            conn.execute('INSERT OR REPLACE INTO revision_schedule_params (id, params) VALUES (1, ?)', (params,))
+        else:
+            _create_schedule_triggers(conn)
+
+def rebuild_revision_schedule(page_numbers: Optional[Iterable[int]] = None) -> int:
+    """Replay history for the given pages (default: all); returns pages scheduled."""
+    with db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        return _replay(conn, page_numbers)
+
+def refresh_stale_pages() -> int:
+    """Replay only the pages the triggers marked stale; returns how many."""
+    with db_connection() as conn:
+        if conn.execute('SELECT 1 FROM page_schedule WHERE stale = 1 LIMIT 1').fetchone() is None:
+            return 0
+        conn.execute('BEGIN IMMEDIATE')
+        stale = [row[0] for row in conn.execute('SELECT page_number FROM page_schedule WHERE stale = 1')]
+        _replay(conn, stale)
+        return len(stale)
+
+def get_due_pages(limit: int = 20, as_of: Optional[str] = None) -> Dict[str, Any]:
+    """Pages due for revision by ``as_of`` (default now), most overdue first."""
+    refresh_stale_pages()
+    with db_connection() as conn:
+        as_of = as_of or conn.execute('SELECT CURRENT_TIMESTAMP').fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT page_number, {', '.join(SCHEDULE_COLUMNS)},
+                   round(julianday(?) - julianday(due_date), 2) AS overdue_days
+            FROM page_schedule
+            WHERE due_date <= ?
+            ORDER BY due_date, page_number
+            LIMIT ?
+        ''', (as_of, as_of, limit)).fetchall()
+        total = conn.execute('SELECT COUNT(*) FROM page_schedule WHERE due_date <= ?', (as_of,)).fetchone()[0]
+
+    return {'as_of': as_of, 'total_due': total, 'pages': [dict(row) for row in rows]}
+
+# Bulk loads drop the per-row triggers and replay every page once at the end
+register_bulk_load_triggers(SCHEDULE_TRIGGERS, _create_schedule_triggers, _replay)
+
+if __name__ == '__main__':
+    from database import init_database
+    init_database()
+    init_revision_schedule()
+    print(f"✅ Rebuilt revision schedule for {rebuild_revision_schedule()} pages")
@@ -0,0 +1,279 @@
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+from typing import Dict, List, Optional, Any, Iterable
+
+# Arabic diacritics (tashkeel) and Quranic annotation marks
+ARABIC_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u06D6-\u06ED]')
+
+# Letter variants folded together for search, so a query typed on an ordinary
+# keyboard matches the IndoPak spelling
+LETTER_VARIANTS = str.maketrans({
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627', '\ufe8e': '\u0627',  # alef forms
+    '\u0649': '\u064a', '\u06cc': '\u064a', '\u06d2': '\u064a', '\u066e': '\u064a', '\u0626': '\u064a',  # yeh forms
+    '\u0624': '\u0648',  # waw with hamza
+    '\u0629': '\u0647', '\u06c1': '\u0647', '\u06be': '\u0647',  # teh marbuta, heh forms
+    '\u06a9': '\u0643', '\u06aa': '\u0643',  # kaf forms
+})
+ALEF = '\u0627'
+# Everything but the base Arabic letters (hamza..ghain, feh..yeh)
+NON_LETTERS = re.compile(r'[^\u0621-\u063A\u0641-\u064A]')
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_INDEX_MAGIC = b'QULSRCH1'
+MIN_GRAM_TERM = 3  # shorter terms match whole words only
+
+
+def remove_diacritics(text: str) -> str:
+    return ARABIC_DIACRITICS.sub('', text)
+
+
+def normalize_arabic(text: str) -> str:
+    """Search form of a word: base letters only, variants folded.
+
+    Drops diacritics, Quranic marks, tatweel, ayah numbers and the
+    zero-width / private-use characters found in the QUL text. Alefs after
+    the first letter are dropped as well: the Mushaf often writes them as a
+    superscript (dagger) alef or leaves them out, so both spellings of e.g.
+    the word for "worlds" reduce to the same form.
+    """
+    letters = NON_LETTERS.sub('', text.translate(LETTER_VARIANTS))
+    return letters[:1] + letters[1:].replace(ALEF, '')
+
+
+def _trigrams(token: str) -> set:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _source_fingerprint(source_paths: Iterable[str]) -> List[Any]:
+    fingerprint = [SEARCH_INDEX_VERSION, sys.byteorder]
+    for path in source_paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def _table(strings: List[bytes]) -> tuple:
+    """Concatenated strings plus their offsets (len(strings) + 1 entries)."""
+    offsets = array('I', [0])
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+    return offsets, b''.join(strings)
+
+
+def build_search_index(mushaf, fingerprint: List[Any]) -> bytes:
+    """Serialize the inverted and trigram indexes over a MushafIndex's words.
+
+    Words are numbered by position, skipping ayah-number markers, so a
+    phrase is a run of consecutive positions even across ayah ends.
+    """
+    position_words = array('I')
+    postings: Dict[str, List[int]] = {}
+    for word_id in range(1, mushaf.word_count + 1):
+        word = mushaf.get_word(word_id)
+        token = normalize_arabic(word['text']) if word else ''
+        if token:
+            postings.setdefault(token, []).append(len(position_words))
+            position_words.append(word_id)
+
+    word_pages = array('H', bytes(2 * (mushaf.word_count + 1)))
+    for page_number in mushaf.page_numbers():
+        for word_id in mushaf.page_word_ids(page_number):
+            word_pages[word_id] = page_number
+
+    # Tokens sorted by UTF-8 bytes, so lookups can binary search the raw table
+    tokens = sorted(postings, key=lambda token: token.encode('utf-8'))
+    token_offsets, token_blob = _table([token.encode('utf-8') for token in tokens])
+    posting_offsets = array('I', [0])
+    posting_values = array('I')
+    grams: Dict[str, List[int]] = {}
+    for token_id, token in enumerate(tokens):
+        posting_values.extend(postings[token])
+        posting_offsets.append(len(posting_values))
+        for gram in _trigrams(token):
+            grams.setdefault(gram, []).append(token_id)
+
+    gram_keys = sorted(grams, key=lambda gram: gram.encode('utf-8'))
+    gram_offsets, gram_blob = _table([gram.encode('utf-8') for gram in gram_keys])
+    gram_posting_offsets = array('I', [0])
+    gram_postings = array('I')
+    for gram in gram_keys:
+        gram_postings.extend(grams[gram])
+        gram_posting_offsets.append(len(gram_postings))
+
+    sections = [
+        ('position_words', position_words), ('word_pages', word_pages),
+        ('token_offsets', token_offsets), ('token_blob', token_blob),
+        ('posting_offsets', posting_offsets), ('postings', posting_values),
+        ('gram_offsets', gram_offsets), ('gram_blob', gram_blob),
+        ('gram_posting_offsets', gram_posting_offsets), ('gram_postings', gram_postings),
+    ]
+    layout = {}
+    body = bytearray()
+    for name, data in sections:
+        raw = data.tobytes() if isinstance(data, array) else data
+        layout[name] = [len(body), len(raw)]
+        body += raw + bytes(-len(raw) % 4)  # keep every section 4-byte aligned
+
+    header = json.dumps({'fingerprint': fingerprint, 'sections': layout}).encode('utf-8')
+    header += b' ' * (-(len(SEARCH_INDEX_MAGIC) + 4 + len(header)) % 4)
+    return SEARCH_INDEX_MAGIC + array('I', [len(header)]).tobytes() + header + bytes(body)
+
+
+class SearchIndex:
+    """Diacritic-insensitive word and phrase search over the Mushaf text.
+
+    Backed by the buffer written by build_search_index (normally an mmap of
+    the file next to the QUL databases); every section is read in place
+    through memoryviews, so loading costs no parsing.
+    """
+
+    def __init__(self, buffer, mushaf):
+        self._buffer = buffer
+        self._mushaf = mushaf
+        view = memoryview(buffer)
+        if bytes(view[:len(SEARCH_INDEX_MAGIC)]) != SEARCH_INDEX_MAGIC:
+            raise ValueError('Not a search index file')
+        start = len(SEARCH_INDEX_MAGIC) + 4
+        header_length = view[len(SEARCH_INDEX_MAGIC):start].cast('I')[0]
+        self.header = json.loads(bytes(view[start:start + header_length]))
+        body = start + header_length
+
+        def section(name, fmt=None):
+            offset, length = self.header['sections'][name]
+            data = view[body + offset:body + offset + length]
+            return data.cast(fmt) if fmt else data
+
+        self._position_words = section('position_words', 'I')
+        self._word_pages = section('word_pages', 'H')
+        self._token_offsets = section('token_offsets', 'I')
+        self._token_blob = section('token_blob')
+        self._posting_offsets = section('posting_offsets', 'I')
+        self._postings = section('postings', 'I')
+        self._gram_offsets = section('gram_offsets', 'I')
+        self._gram_blob = section('gram_blob')
+        self._gram_posting_offsets = section('gram_posting_offsets', 'I')
+        self._gram_postings = section('gram_postings', 'I')
+        self.token_count = len(self._token_offsets) - 1
+
+    # --- Sorted string tables ---
+    @staticmethod
+    def _find(offsets, blob, key: bytes) -> Optional[int]:
+        """Binary search a sorted string table for ``key``."""
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(blob[offsets[mid]:offsets[mid + 1]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(offsets) - 1 and bytes(blob[offsets[lo]:offsets[lo + 1]]) == key:
+            return lo
+        return None
+
+    def _token(self, token_id: int) -> str:
+        return bytes(self._token_blob[self._token_offsets[token_id]:self._token_offsets[token_id + 1]]).decode('utf-8')
+
+    def _token_positions(self, token_id: int):
+        return self._postings[self._posting_offsets[token_id]:self._posting_offsets[token_id + 1]]
+
+    def _matching_tokens(self, term: str) -> List[int]:
+        """Token ids equal to ``term``, or (for longer terms) containing it."""
+        if len(term) < MIN_GRAM_TERM:
+            token_id = self._find(self._token_offsets, self._token_blob, term.encode('utf-8'))
+            return [] if token_id is None else [token_id]
+
+        # Inside a word a leading alef has been dropped ("bi" + "al-" -> "bil-"),
+        # so also match the rest of the term after at least one prefix letter
+        core = term[1:] if term.startswith(ALEF) and len(term) > MIN_GRAM_TERM else term
+        candidates = None
+        for gram in _trigrams(core):
+            gram_id = self._find(self._gram_offsets, self._gram_blob, gram.encode('utf-8'))
+            if gram_id is None:
+                return []
+            tokens = set(self._gram_postings[self._gram_posting_offsets[gram_id]:self._gram_posting_offsets[gram_id + 1]])
+            candidates = tokens if candidates is None else candidates & tokens
+            if not candidates:
+                return []
+        return sorted(
+            token_id for token_id in candidates
+            if term in self._token(token_id) or (core != term and self._token(token_id).find(core, 1) != -1)
+        )
+
+    def _term_positions(self, term: str) -> set:
+        positions = set()
+        for token_id in self._matching_tokens(term):
+            positions.update(self._token_positions(token_id))
+        return positions
+
+    # --- Search ---
+    def search(self, query: str, limit: int = 50) -> Dict[str, Any]:
+        """Find ``query`` as a phrase: each term matching consecutive words in order.
+
+        Returns every matching page and the first ``limit`` matches with their
+        word ids, location, ayah and page.
+        """
+        terms = [term for term in (normalize_arabic(part) for part in query.split()) if term]
+        if not terms:
+            return {'terms': [], 'total': 0, 'pages': [], 'results': []}
+
+        # Anchor on the rarest term, then check the others at their offsets
+        term_positions = [self._term_positions(term) for term in terms]
+        anchor = min(range(len(terms)), key=lambda i: len(term_positions[i]))
+        starts = sorted(
+            position - anchor for position in term_positions[anchor]
+            if all(position - anchor + i in term_positions[i] for i in range(len(terms)) if i != anchor)
+        )
+
+        results = []
+        for start in starts[:limit]:
+            word_ids = [self._position_words[start + i] for i in range(len(terms))]
+            surah, ayah = self._mushaf.word_position(word_ids[0])
+            results.append({
+                'word_ids': word_ids,
+                'location': self._mushaf.get_word(word_ids[0])['location'],
+                'surah': surah,
+                'ayah': ayah,
+                'page_number': self._word_pages[word_ids[0]]
+            })
+
+        return {
+            'terms': terms,
+            'total': len(starts),
+            'pages': sorted({self._word_pages[self._position_words[start]] for start in starts}),
+            'results': results
+        }
+
+
+def load_search_index(mushaf, index_path: str, source_paths: Iterable[str]) -> SearchIndex:
+    """Map the persisted index, rebuilding it first if missing or built from other sources.
+
+    If the directory is not writable the index is built in memory instead.
+    """
+    fingerprint = _source_fingerprint(source_paths)
+    if os.path.exists(index_path):
+        with open(index_path, 'rb') as index_file:
+            mapped = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            index = SearchIndex(mapped, mushaf)
+            if index.header['fingerprint'] == fingerprint:
+                return index
+            del index
+        except (ValueError, KeyError):
+            pass
+        mapped.close()
+
+    data = build_search_index(mushaf, fingerprint)
+    try:
+        partial_path = index_path + '.partial'
+        with open(partial_path, 'wb') as index_file:
+            index_file.write(data)
+        os.replace(partial_path, index_path)
+    except OSError as e:
+        print(f"Search index not persisted ({e}); using an in-memory copy")
+        return SearchIndex(data, mushaf)
+    with open(index_path, 'rb') as index_file:
+        return SearchIndex(mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ), mushaf)
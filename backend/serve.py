@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Production server: load and warm the app once, then fork the workers.
+
+The master process imports the app (tracker schema, QUL index, search index)
+and runs warm_up() before forking, so every worker starts with all page, juz
+and surah payloads built and shares them copy-on-write instead of building
+its own. The first request after a deploy is served from warm caches.
+
+Signals (gunicorn):
+    HUP          re-fork the workers from the warm master (new config, same code)
+    USR2, QUIT   start a new master on new code, then retire the old one
+    TERM         finish in-flight requests and exit
+
+Readiness: GET /api/ready answers 200 once warm-up is done, 503 before.
+
+Usage:
+    python serve.py                             # one worker per core on 0.0.0.0:5000
+    python serve.py --workers 4 --bind 127.0.0.1:8000 --pidfile serve.pid
+
+Requires gunicorn (Unix only). Without it this falls back to a single
+threaded process, e.g. on Windows.
+"""
+
+import argparse
+import gc
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn is optional; see the fallback in main()
+    BaseApplication = object
+
+THREADS_PER_WORKER = 4  # streaming responses (NDJSON, exports) hold a thread each
+
+
+def prepare_for_fork():
+    """Close handles workers must not inherit and freeze the warmed heap.
+
+    The QUL data is fully in memory after import, so its SQLite handles can
+    go; each worker opens its own tracker and shard connections (see database.get_pool).
+    gc.freeze() moves everything loaded so far out of the collector's reach,
+    so collections in a worker never write to (and so copy) the shared pages.
+    """
+    import app as app_module
+    from database import close_all_pools
+
+    app_module.QUL.close_all()
+    close_all_pools()
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """gunicorn hook: start each worker's metrics from zero.
+
+    The inherited counters hold the master's warm-up traffic; left alone,
+    every worker would report it again under its own pid.
+    """
+    import metrics
+    metrics.reset()
+
+
+class HifzTrackerServer(BaseApplication):
+    """gunicorn application serving the already-imported, already-warm Flask app."""
+
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the Hifz Tracker API with pre-forked, pre-warmed workers.')
+    parser.add_argument('--bind', default='0.0.0.0:5000', help='address to listen on')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes (default: one per core)')
+    parser.add_argument('--threads', type=int, default=THREADS_PER_WORKER, help='threads per worker')
+    parser.add_argument('--timeout', type=int, default=60, help='seconds before a silent worker is restarted')
+    parser.add_argument('--pidfile', help='write the master pid here (for HUP / USR2)')
+    args = parser.parse_args()
+
+    print("🔄 Loading and warming the app...")
+    from app import app, warm_up, WARM_STATE
+    warm_up()
+    print(f"✅ Warmed {WARM_STATE['payloads']} payloads in {WARM_STATE['seconds']}s")
+
+    if BaseApplication is object:
+        print("⚠️  gunicorn is not installed; serving from a single threaded process")
+        host, _, port = args.bind.rpartition(':')
+        app.run(host=host or '0.0.0.0', port=int(port), threaded=True)
+        return 0
+
+    prepare_for_fork()
+    print(f"🚀 Serving on {args.bind} with {args.workers} workers x {args.threads} threads")
+    HifzTrackerServer(app, {
+        'bind': args.bind,
+        'workers': args.workers,
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'graceful_timeout': 30,
+        'keepalive': 5,
+        'preload_app': True,
+        'post_fork': post_fork,
+        'pidfile': args.pidfile,
+        'accesslog': '-'
+    }).run()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Issue and revoke the tokens that route API requests to a user's shard.
+
+A request sent with ``Authorization: Bearer <token>`` reads and writes the
+data of the user the token was issued to; requests without a token use the
+shared database. Tokens are shown once, when issued; only their hashes are
+stored.
+
+Usage:
+    python user_tokens.py add alice      # print a new token for alice
+    python user_tokens.py revoke alice   # revoke all of alice's tokens
+    python user_tokens.py list
+"""
+
+import argparse
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import init_database, init_user_tokens, create_user_token, revoke_user_tokens, list_user_tokens
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage per-user API tokens.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('add', help='issue a new token').add_argument('user_id')
+    commands.add_parser('revoke', help="revoke all of a user's tokens").add_argument('user_id')
+    commands.add_parser('list', help='users with tokens')
+    args = parser.parse_args()
+
+    init_database()
+    init_user_tokens()
+
+    if args.command == 'add':
+        try:
+            token = create_user_token(args.user_id)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ Token for {args.user_id.lower()} (shown once):")
+        print(token)
+    elif args.command == 'revoke':
+        revoked = revoke_user_tokens(args.user_id)
+        print(f"✅ Revoked {revoked} token(s) for {args.user_id.lower()}")
+    else:
+        users = list_user_tokens()
+        if not users:
+            print("No tokens issued")
+        for user in users:
+            print(f"{user['user_id']}: {user['tokens']} token(s), last issued {user['last_issued']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import React, { useEffect, useState, useCallback } from 'react';
+import quranPageService from '../services/QuranPageService';
 
 const MushafPage = ({ pageNumber, onMistakesChange }) => {
   const [pageData, setPageData] = useState(null);
@@ -40,12 +41,8 @@ const MushafPage = ({ pageNumber, onMistakesChange }) => {
       
       const attemptLoad = async () => {
         try {
-          const response = await fetch(`/api/quran/page/${pageNumber}`);
-          if (!response.ok) {
-            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-          }
-          
-          const data = await response.json();
+          // Served from the streamed range when already prefetched
+          const data = await quranPageService.getPage(pageNumber);
           
           if (!isCancelled) {
             setPageData(data);
@@ -18,6 +18,7 @@ const ProgressDashboard = ({ onClose }) => {
     date_from: '',
     date_to: ''
   });
+  const [userToken, setUserToken] = useState(sessionSubmissionService.userToken || '');
 
   const ratings = ['Perfect', 'Good', 'Okay', 'Bad', 'Rememorize'];
   const ratingColors = {
@@ -47,6 +48,13 @@ const ProgressDashboard = ({ onClose }) => {
     loadRecitations();
   }, [loadRecitations]);
 
+  // Switch between a user's own data (by token) and the shared database
+  const switchUser = useCallback((token) => {
+    sessionSubmissionService.setUserToken(token);
+    setUserToken(sessionSubmissionService.userToken || '');
+    loadRecitations();
+  }, [loadRecitations]);
+
   // Sorting
   const sortedData = useMemo(() => {
     if (!sortConfig.key) return recitations;
@@ -226,6 +234,16 @@ const ProgressDashboard = ({ onClose }) => {
     <div className="progress-dashboard">
       <div className="dashboard-header">
         <h2>Recitation Progress Dashboard</h2>
+        <div className="dashboard-user">
+          <input
+            type="password"
+            value={userToken}
+            onChange={(e) => setUserToken(e.target.value)}
+            placeholder="User token"
+          />
+          <button onClick={() => switchUser(userToken)} className="btn-primary">Use Token</button>
+          <button onClick={() => switchUser(null)} className="btn-secondary">Use Shared Data</button>
+        </div>
         <button onClick={onClose} className="btn-secondary">Close Dashboard</button>
       </div>
 
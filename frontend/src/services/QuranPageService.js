@@ -0,0 +1,81 @@
+// QuranPageService.js
+// Loads Mushaf pages, streaming ranges ahead of the reader so page turns are instant
+
+const PREFETCH_PAGES = 10; // pages streamed ahead of the one being read
+
+class QuranPageService {
+  constructor() {
+    this.apiBaseUrl = '/api/quran';
+    this.pages = new Map(); // page number -> { pageData, wordData }
+    this.pending = new Map(); // page number -> promise resolved when its line arrives
+  }
+
+  // Stream pages from..to as NDJSON; onPage is called as each page arrives
+  async streamPages(from, to, onPage = null) {
+    const response = await fetch(`${this.apiBaseUrl}/pages?from=${from}&to=${to}`);
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+
+    const handleLine = (line) => {
+      if (!line) return;
+      const { page_number: pageNumber, ...page } = JSON.parse(line);
+      this.pages.set(pageNumber, page);
+      if (onPage) onPage(pageNumber, page);
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+      const lines = buffered.split('\n');
+      buffered = lines.pop();
+      lines.forEach(handleLine);
+    }
+    handleLine(buffered + decoder.decode());
+  }
+
+  // Start streaming the pages after pageNumber that are not loaded yet
+  prefetchAfter(pageNumber) {
+    const from = pageNumber + 1;
+    const to = pageNumber + PREFETCH_PAGES; // the server stops at the last page
+    if (this.pages.has(from) || this.pending.has(from)) return;
+
+    const range = this.streamPages(from, to).catch((err) => {
+      console.log('Page prefetch failed:', err.message);
+    });
+    for (let n = from; n <= to; n++) {
+      this.pending.set(n, range);
+    }
+    range.finally(() => {
+      for (let n = from; n <= to; n++) {
+        this.pending.delete(n);
+      }
+    });
+  }
+
+  // A single page: from the cache, from a range already streaming, or fetched on its own
+  async getPage(pageNumber) {
+    if (!this.pages.has(pageNumber) && this.pending.has(pageNumber)) {
+      await this.pending.get(pageNumber);
+    }
+    if (!this.pages.has(pageNumber)) {
+      const response = await fetch(`${this.apiBaseUrl}/page/${pageNumber}`);
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+      this.pages.set(pageNumber, await response.json());
+    }
+
+    this.prefetchAfter(pageNumber);
+    return this.pages.get(pageNumber);
+  }
+}
+
+// Create and export singleton instance
+const quranPageService = new QuranPageService();
+export default quranPageService;
@@ -1,11 +1,16 @@
 // SessionSubmissionService.js
 // Handles data collection, validation, and submission for recitation sessions
 
+const MAX_BATCH_SIZE = 5000; // sessions per /recitations/batch request (the server's limit)
+
 class SessionSubmissionService {
   constructor() {
     this.apiBaseUrl = '/api';
     this.offlineQueue = [];
     this.isOnline = navigator.onLine;
+    this.quranMeta = null;
+    this.recitationCache = new Map(); // request URL -> { etag, data }
+    this.userToken = localStorage.getItem('hifz_user_token'); // routes requests to this user's data; null for the shared database
     
     // Listen for online/offline events
     window.addEventListener('online', this.handleOnline.bind(this));
@@ -13,6 +18,9 @@ class SessionSubmissionService {
     
     // Load offline queue from localStorage
     this.loadOfflineQueue();
+
+    // Load page -> surah/juz metadata from the server
+    this.loadQuranMetadata();
   }
 
   // Data collection and validation
@@ -25,8 +33,8 @@ class SessionSubmissionService {
   }) {
     const sessionData = {
       page_number: parseInt(pageNumber),
-      surah_name: this.extractSurahName(pageNumber), // We'll need to implement this
-      juz: this.calculateJuz(pageNumber), // We'll need to implement this
+      surah_name: this.extractSurahName(pageNumber), // The server re-derives these from page_number
+      juz: this.calculateJuz(pageNumber),
       rating,
       manual_mistakes: mistakes,
       notes: notes.trim(),
@@ -40,7 +48,8 @@ class SessionSubmissionService {
   validateSessionData(sessionData) {
     const errors = [];
     
-    if (!sessionData.page_number || sessionData.page_number < 1 || sessionData.page_number > 604) {
+    const pageCount = this.quranMeta ? this.quranMeta.pages.length : 604;
+    if (!sessionData.page_number || sessionData.page_number < 1 || sessionData.page_number > pageCount) {
       errors.push('Invalid page number');
     }
     
@@ -67,6 +76,22 @@ class SessionSubmissionService {
     };
   }
 
+  // Switch the user whose recitations are read and written; a token is issued by user_tokens.py
+  setUserToken(token) {
+    this.userToken = (token || '').trim() || null;
+    if (this.userToken) {
+      localStorage.setItem('hifz_user_token', this.userToken);
+    } else {
+      localStorage.removeItem('hifz_user_token');
+    }
+    this.recitationCache.clear();
+  }
+
+  // Request headers, plus the user's token when one is set
+  headers(extra = {}, token = this.userToken) {
+    return token ? { ...extra, 'Authorization': `Bearer ${token}` } : extra;
+  }
+
   // Submit session data
   async submitSession(sessionData) {
     const validation = this.validateSessionData(sessionData);
@@ -86,9 +111,9 @@ class SessionSubmissionService {
       try {
         const response = await fetch(`${this.apiBaseUrl}/recitations`, {
           method: 'POST',
-          headers: {
+          headers: this.headers({
             'Content-Type': 'application/json',
-          },
+          }),
           body: JSON.stringify(sessionData)
         });
 
@@ -130,6 +155,7 @@ class SessionSubmissionService {
     const queueItem = {
       id: Date.now().toString(),
       data: sessionData,
+      userToken: this.userToken,
       timestamp: new Date().toISOString(),
       retryCount: 0
     };
@@ -149,33 +175,85 @@ class SessionSubmissionService {
       return;
     }
 
-    const results = [];
-    const failedItems = [];
+    // One batch per user: each user's sessions are stored in their own database
+    const groups = new Map();
+    this.offlineQueue.forEach(item => {
+      const token = item.userToken || null;
+      if (!groups.has(token)) {
+        groups.set(token, []);
+      }
+      groups.get(token).push(item);
+    });
 
-    for (const item of this.offlineQueue) {
-      try {
-        const result = await this.submitSession(item.data);
-        if (result.success && !result.queued) {
-          results.push({ id: item.id, success: true });
-        } else {
-          failedItems.push(item);
-        }
-      } catch (error) {
-        item.retryCount = (item.retryCount || 0) + 1;
-        if (item.retryCount < 3) {
-          failedItems.push(item);
-        } else {
-          results.push({ id: item.id, success: false, error: error.message });
+    const results = [];
+    const remaining = [];
+    for (const [token, queue] of groups) {
+      for (let start = 0; start < queue.length; start += MAX_BATCH_SIZE) {
+        const flushed = await this.flushQueuedBatch(queue.slice(start, start + MAX_BATCH_SIZE), token);
+        results.push(...flushed.results);
+        remaining.push(...flushed.remaining);
+        if (flushed.rejected) {
+          // The rest of this user's sessions would fail the same way; keep them for later
+          remaining.push(...queue.slice(start + MAX_BATCH_SIZE));
+          break;
         }
       }
     }
 
-    this.offlineQueue = failedItems;
+    this.offlineQueue = remaining;
     this.saveOfflineQueue();
 
     return results;
   }
 
+  // Flush up to MAX_BATCH_SIZE of one user's queued sessions in one request; the server inserts them in one transaction
+  async flushQueuedBatch(queue, token) {
+    let response;
+    try {
+      response = await fetch(`${this.apiBaseUrl}/recitations/batch`, {
+        method: 'POST',
+        headers: this.headers({
+          'Content-Type': 'application/json',
+        }, token),
+        // Keep the time each session was recorded, not the time it is flushed
+        body: JSON.stringify(queue.map(item => ({
+          ...item.data,
+          recitation_date: item.data.recitation_date || item.timestamp
+        })))
+      });
+    } catch (error) {
+      // Still offline as far as the server is concerned; keep everything queued
+      console.warn('Failed to flush offline queue:', error);
+      return { results: [], remaining: queue, rejected: true };
+    }
+
+    const payload = await response.json().catch(() => ({}));
+    if (!Array.isArray(payload.results)) {
+      const error = payload.error || `HTTP ${response.status}`;
+      console.warn('Offline queue batch rejected:', error);
+      if (response.status < 500) {
+        // e.g. a revoked token (401): the sessions are fine, so keep them all until the user fixes it
+        queue.forEach(item => { item.lastError = error; });
+        return {
+          results: queue.map(item => ({ id: item.id, success: false, queued: true, error })),
+          remaining: queue,
+          rejected: true
+        };
+      }
+      // Server error; retry later, giving up on an item after three failures
+      queue.forEach(item => { item.retryCount = (item.retryCount || 0) + 1; });
+      return { results: [], remaining: queue.filter(item => item.retryCount < 3), rejected: true };
+    }
+
+    // Per-item validation errors will not succeed on retry, so they are dropped
+    const results = payload.results.map((result, index) => (
+      result.error
+        ? { id: queue[index].id, success: false, error: result.error }
+        : { id: queue[index].id, success: true }
+    ));
+    return { results, remaining: [] };
+  }
+
   // Offline queue management
   saveOfflineQueue() {
     try {
@@ -203,7 +281,8 @@ class SessionSubmissionService {
       pageNumber: item.data.page_number,
       rating: item.data.rating,
       timestamp: item.timestamp,
-      retryCount: item.retryCount || 0
+      retryCount: item.retryCount || 0,
+      lastError: item.lastError || null
     }));
   }
 
@@ -223,9 +302,30 @@ class SessionSubmissionService {
   }
 
   // Helper functions for Quran data
+  async loadQuranMetadata() {
+    try {
+      const response = await fetch(`${this.apiBaseUrl}/quran/meta`);
+      if (response.ok) {
+        this.quranMeta = await response.json();
+      }
+    } catch (error) {
+      console.warn('Failed to load Quran metadata:', error);
+    }
+  }
+
+  getPageMeta(pageNumber) {
+    if (!this.quranMeta) return null;
+    const page = this.quranMeta.pages[parseInt(pageNumber) - 1];
+    return page && page.page_number === parseInt(pageNumber) ? page : null;
+  }
+
   extractSurahName(pageNumber) {
-    // This would typically come from the QUL database
-    // For now, we'll use a simplified mapping
+    const pageMeta = this.getPageMeta(pageNumber);
+    if (pageMeta) {
+      return pageMeta.surah_names[0];
+    }
+
+    // Fall back to a simplified mapping until the metadata has loaded
     const surahMapping = this.getSimplifiedSurahMapping();
     
     for (const surah of surahMapping) {
@@ -238,6 +338,11 @@ class SessionSubmissionService {
   }
 
   calculateJuz(pageNumber) {
+    const pageMeta = this.getPageMeta(pageNumber);
+    if (pageMeta) {
+      return pageMeta.juz;
+    }
+
     // Approximate juz calculation (each juz is roughly 20 pages)
     return Math.ceil(pageNumber / 20);
   }
@@ -267,22 +372,46 @@ class SessionSubmissionService {
       });
 
       const url = `${this.apiBaseUrl}/recitations${queryParams.toString() ? '?' + queryParams.toString() : ''}`;
-      const response = await fetch(url);
-
-      if (!response.ok) {
-        throw new Error(`HTTP ${response.status}`);
-      }
-
-      return await response.json();
+      return await this.fetchVersioned(url);
     } catch (error) {
       console.error('Failed to fetch recitations:', error);
       throw error;
     }
   }
 
+  // Recitations inserted, updated or deleted since a data version (see /api/recitations/changes)
+  async fetchRecitationChanges(since = 0) {
+    return this.fetchVersioned(`${this.apiBaseUrl}/recitations/changes?since=${since}`);
+  }
+
+  // GET with If-None-Match; a 304 means the data version is unchanged, so reuse the last body
+  async fetchVersioned(url) {
+    const cached = this.recitationCache.get(url);
+    const response = await fetch(url, {
+      cache: 'no-store',
+      headers: this.headers(cached ? { 'If-None-Match': cached.etag } : {})
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}`);
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      this.recitationCache.set(url, { etag, data });
+    }
+    return data;
+  }
+
   async fetchRecitation(id) {
     try {
-      const response = await fetch(`${this.apiBaseUrl}/recitations/${id}`);
+      const response = await fetch(`${this.apiBaseUrl}/recitations/${id}`, {
+        headers: this.headers()
+      });
 
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}`);
@@ -299,9 +428,9 @@ class SessionSubmissionService {
     try {
       const response = await fetch(`${this.apiBaseUrl}/recitations/${id}`, {
         method: 'PUT',
-        headers: {
+        headers: this.headers({
           'Content-Type': 'application/json',
-        },
+        }),
         body: JSON.stringify(updateData)
       });
 
@@ -320,7 +449,8 @@ class SessionSubmissionService {
   async deleteRecitation(id) {
     try {
       const response = await fetch(`${this.apiBaseUrl}/recitations/${id}`, {
-        method: 'DELETE'
+        method: 'DELETE',
+        headers: this.headers()
       });
 
       if (!response.ok) {
@@ -336,7 +466,9 @@ class SessionSubmissionService {
 
   async fetchStats() {
     try {
-      const response = await fetch(`${this.apiBaseUrl}/recitations/stats`);
+      const response = await fetch(`${this.apiBaseUrl}/recitations/stats`, {
+        headers: this.headers()
+      });
 
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}`);